@@ -1,54 +1,366 @@
+import json
+import time
 import uvicorn
-from fastapi import FastAPI
+from typing import List
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from langserve import add_routes
 from utils.state_graph import app
 from new_cv.state_graph import improve_cv_app
 from langchain_core.runnables import RunnableLambda
-from utils.config import THREAD_CONFIG, INITIAL_STATE
+from utils.config import (
+    INITIAL_STATE, EMBEDDING_WARMUP, MAX_UPLOAD_BYTES, make_thread_config,
+    SCREENING_TOP_K, SCREENING_MAX_CANDIDATES, CLIENT_ID_HEADER
+)
+from utils.document_parser import SUPPORTED_EXTENSIONS, get_extension, parse_document, warm_up_pdf_workers
+from utils.document_store import document_store, document_thread_id, load_parsed_cv
+from utils.screening import ScreeningCandidate, screen_candidates
+from utils.candidate_index import get_candidate_index, save_candidate_index
+from utils.executor import run_blocking
+from utils.embeddings import warm_up_embeddings
+from utils.token_budget import warm_up_tokenizer
+from utils.section_retrieval import get_section_query_vectors
+from utils.streaming import stream_graph_events, project_state
+from utils.text_store import get_text_store
+from utils.metrics import (
+    HTTP_DURATION, ADMISSION_REJECTED, render_metrics, start_request_timings, format_server_timing
+)
+from utils.admission import AdmissionController, Overloaded, client_identity
+from utils.llm_pool import set_client_id
+from utils.job_queue import get_job_queue
 
 class ImproveCVRequest(BaseModel):
     cv_content: str
     feedback: str
     cv_file_path: str
 
-def improve_cv_wrapper(info: dict):
+class StreamRequest(BaseModel):
+    input: dict
+
+class JobRequest(BaseModel):
+    kind: str
+    input: dict
+
+class CandidateRequest(BaseModel):
+    document_id: str
+
+class CandidateSearchRequest(BaseModel):
+    job_info: str
+    k: int = 10
+
+# Campos del estado final que muestra el frontend; el resto no viaja por la red
+ANALYSIS_RESPONSE_FIELDS = (
+    "is_cv_valid", "feedback", "summary", "compatibility_analysis", "person_is_postuled_to_job",
+    "document_id", "cv_content_ref", "cv_content_preview", "token_usage"
+)
+IMPROVE_RESPONSE_FIELDS = ("improved_cv", "document_id", "token_usage")
+
+def build_improve_state(info: dict):
     cv_content = info.get("cv_content", "")
+    if not cv_content and info.get("cv_content_ref"):
+        try:
+            cv_content = get_text_store().get(info["cv_content_ref"])
+        except KeyError:
+            cv_content = ""
     feedback = info.get("feedback", "")
     cv_file_path = info.get("cv_file_path", "")
+    document_id = info.get("document_id", "")
     
     state = {
         "cv_content": cv_content,
         "feedback": feedback,
         "cv_file_path": cv_file_path,
-        "improved_cv": ""
+        "document_id": document_id,
+        "improved_cv": "",
+        "token_usage": None
     }
-    
-    return improve_cv_app.invoke(state, config=THREAD_CONFIG)
+    return state
+
+def build_thread_config(graph_name: str, state: dict) -> dict:
+    """Cada CV tiene su propio hilo, así que una petición posterior reutiliza su estado guardado"""
+    thread_id = document_thread_id(
+        graph_name, state.get("document_id", ""), state.get("cv_file_path", ""), state.get("cv_content", "")
+    )
+    return make_thread_config(thread_id)
 
+async def improve_cv_wrapper(info: dict):
+    state = await run_blocking(build_improve_state, info)
+    config = await run_blocking(build_thread_config, "improve", state)
+    result = await improve_cv_app.ainvoke(state, config=config)
+    return project_state(result, IMPROVE_RESPONSE_FIELDS)
 
-def simple_llm_wrapper(info: dict):
+
+def build_analysis_state(info: dict):
     person_is_postuled_to_job = info.get("person_is_postuled_to_job", True)
     job_info = info.get("job_info", None)
     cv_file_path = info.get("cv_file_path", "")
+    document_id = info.get("document_id", "")
 
     state = {
         **INITIAL_STATE,
         "person_is_postuled_to_job": person_is_postuled_to_job,
         "job_info": job_info,
-        "cv_file_path": cv_file_path
+        "cv_file_path": cv_file_path,
+        "document_id": document_id
     }
-    return app.invoke(state, config=THREAD_CONFIG)
+    return state
+
+async def simple_llm_wrapper(info: dict):
+    state = build_analysis_state(info)
+    config = await run_blocking(build_thread_config, "analysis", state)
+    result = await app.ainvoke(state, config=config)
+    return project_state(result, ANALYSIS_RESPONSE_FIELDS)
+
+def require_document(info: dict):
+    """Responde 404 antes de ejecutar el grafo si el documento indicado ya no existe, para que el cliente lo vuelva a subir"""
+    document_id = info.get("document_id", "")
+    if document_id:
+        try:
+            document_store.get(document_id)
+        except KeyError as error:
+            raise HTTPException(status_code=404, detail=str(error))
+
+def ndjson_stream(graph, state: dict, config: dict, fields: tuple):
+    """Serializa los eventos del grafo como JSON delimitado por líneas"""
+    async def lines():
+        async for event in stream_graph_events(graph, state, config, fields):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 simple_llm_chain = RunnableLambda(simple_llm_wrapper)
 improve_cv_chain = RunnableLambda(improve_cv_wrapper)
 
+job_queue = get_job_queue()
+job_queue.register("analysis", simple_llm_wrapper)
+job_queue.register("improve", improve_cv_wrapper)
+
 server=FastAPI(
     title="Langchain Server",
     version="1.0",
     description="A simple API Server"
 )
 
+@server.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Mide cada petición y expone sus tiempos por fase en la cabecera Server-Timing"""
+    timings = start_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    HTTP_DURATION.observe(elapsed, method=request.method, path=path, status=response.status_code)
+    # En las respuestas en streaming solo está el tiempo hasta las cabeceras; el resto va en el evento final
+    response.headers["Server-Timing"] = format_server_timing({**timings, "total": elapsed})
+    return response
+
+admission = AdmissionController()
+
+@server.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Identifica al cliente y aplica la cola acotada a las rutas que ejecutan los grafos"""
+    client_host = request.client.host if request.client is not None else ""
+    set_client_id(client_identity(client_host, request.headers.get(CLIENT_ID_HEADER, "")))
+    if not admission.applies_to(request.url.path):
+        return await call_next(request)
+
+    try:
+        await admission.acquire()
+    except Overloaded as error:
+        ADMISSION_REJECTED.inc(reason=error.reason)
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Servidor ocupado, inténtalo de nuevo en unos segundos."},
+            headers={"Retry-After": str(error.retry_after)}
+        )
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        admission.release()
+        raise
+
+    # El hueco se libera cuando termina el cuerpo, no al enviar las cabeceras de un stream
+    body_iterator = response.body_iterator
+
+    async def release_after_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            admission.release()
+
+    response.body_iterator = release_after_body()
+    return response
+
+@server.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@server.on_event("startup")
+def warm_up():
+    warm_up_tokenizer()
+    warm_up_pdf_workers()
+    if EMBEDDING_WARMUP:
+        warm_up_embeddings()
+        get_section_query_vectors()
+
+@server.on_event("startup")
+def start_job_workers():
+    job_queue.start()
+
+@server.on_event("shutdown")
+def save_candidates():
+    save_candidate_index()
+
+@server.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+async def ingest_upload(file: UploadFile):
+    """Valida, parsea y guarda un CV subido, devolviendo el documento almacenado"""
+    if get_extension(file.filename) not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Formato de archivo no soportado: {file.filename}")
+
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="El archivo supera el tamaño máximo permitido.")
+
+    # Parsear al subir valida el archivo y deja el texto en caché para los análisis posteriores
+    try:
+        await run_blocking(parse_document, data, file.filename)
+    except Exception as error:
+        raise HTTPException(status_code=400, detail=f"No se pudo leer el CV: {error}")
+
+    return document_store.add(data, file.filename)
+
+@server.post("/joblens/documents")
+async def upload_document(file: UploadFile = File(...)):
+    """Recibe un CV y devuelve el identificador con el que referenciarlo en los análisis"""
+    document = await ingest_upload(file)
+    return {"document_id": document.document_id, "filename": document.filename, "size": len(document.data)}
+
+@server.get("/joblens/documents/{document_id}")
+async def get_document(document_id: str):
+    """Comprueba que el documento sigue disponible; la consulta renueva su expiración por inactividad"""
+    try:
+        document = document_store.get(document_id)
+    except KeyError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    return {"document_id": document.document_id, "filename": document.filename, "size": len(document.data)}
+
+@server.delete("/joblens/documents/{document_id}")
+async def delete_document(document_id: str):
+    if not document_store.delete(document_id):
+        raise HTTPException(status_code=404, detail="Documento no encontrado o expirado.")
+    return {"deleted": document_id}
+
+@server.post("/joblens/screen")
+async def screen_cvs(
+    job_info: str = Form(...),
+    files: List[UploadFile] = File(default=[]),
+    document_ids: List[str] = Form(default=[]),
+    top_k: int = Form(SCREENING_TOP_K, ge=1, le=SCREENING_MAX_CANDIDATES)
+):
+    """Ordena varios CV frente a una oferta y analiza con el LLM solo los mejores candidatos"""
+    if len(files) + len(document_ids) > SCREENING_MAX_CANDIDATES:
+        raise HTTPException(status_code=413, detail=f"Se admiten como máximo {SCREENING_MAX_CANDIDATES} CV por cribado.")
+
+    candidates = []
+    for file in files:
+        document = await ingest_upload(file)
+        parsed = await run_blocking(parse_document, document.data, document.filename)
+        candidates.append(ScreeningCandidate(document_id=document.document_id, document=parsed))
+    for document_id in document_ids:
+        try:
+            parsed = await run_blocking(load_parsed_cv, document_id)
+        except KeyError as error:
+            raise HTTPException(status_code=404, detail=str(error))
+        candidates.append(ScreeningCandidate(document_id=document_id, document=parsed))
+
+    if not candidates:
+        raise HTTPException(status_code=400, detail="No se indicó ningún CV para cribar.")
+
+    ranking = await screen_candidates(candidates, job_info, top_k=top_k)
+    return {"total": len(ranking), "analyzed": sum(candidate["analyzed"] for candidate in ranking), "candidates": ranking}
+
+@server.post("/joblens/candidates")
+async def index_candidate(request: CandidateRequest):
+    """Añade o actualiza un CV subido en el índice persistente de candidatos"""
+    try:
+        document = document_store.get(request.document_id)
+    except KeyError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+    parsed = await run_blocking(parse_document, document.data, document.filename)
+    # La primera llamada carga el índice de disco y lo reconcilia, así que tampoco se hace en el event loop
+    index = await run_blocking(get_candidate_index)
+    chunks = await run_blocking(index.upsert, request.document_id, parsed, document.created_at)
+    return {"document_id": request.document_id, "chunks": chunks}
+
+@server.delete("/joblens/candidates/{document_id}")
+async def delete_candidate(document_id: str):
+    index = await run_blocking(get_candidate_index)
+    removed = await run_blocking(index.delete, document_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="El documento no está en el índice de candidatos.")
+    return {"deleted": document_id, "chunks": removed}
+
+@server.post("/joblens/candidates/search")
+async def search_candidates(request: CandidateSearchRequest):
+    """Devuelve los CV indexados que mejor encajan con la oferta"""
+    index = await run_blocking(get_candidate_index)
+    candidates = await run_blocking(index.search, request.job_info, request.k)
+    return {"candidates": candidates}
+
+@server.get("/joblens/candidates/stats")
+async def candidate_stats():
+    index = await run_blocking(get_candidate_index)
+    return await run_blocking(index.stats)
+
+# Los endpoints /stream de langserve solo emiten la salida final de la lambda;
+# estos retransmiten el progreso de cada nodo y los tokens del LLM
+@server.post("/joblens/events")
+async def stream_analysis(request: StreamRequest):
+    require_document(request.input)
+    state = build_analysis_state(request.input)
+    config = await run_blocking(build_thread_config, "analysis", state)
+    return ndjson_stream(app, state, config, ANALYSIS_RESPONSE_FIELDS)
+
+@server.post("/joblens/improve-cv/events")
+async def stream_improve_cv(request: StreamRequest):
+    require_document(request.input)
+    state = await run_blocking(build_improve_state, request.input)
+    config = await run_blocking(build_thread_config, "improve", state)
+    return ndjson_stream(improve_cv_app, state, config, IMPROVE_RESPONSE_FIELDS)
+
+# Trabajos en segundo plano: la petición solo encola y el cliente consulta el resultado después
+@server.post("/joblens/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    if request.kind not in job_queue.kinds:
+        raise HTTPException(status_code=400, detail=f"Tipo de trabajo no soportado: {request.kind}")
+    require_document(request.input)
+    try:
+        job = job_queue.submit(request.kind, request.input)
+    except Overloaded as error:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "La cola de trabajos está llena, inténtalo de nuevo en unos segundos."},
+            headers={"Retry-After": str(error.retry_after)}
+        )
+    return {"job_id": job.job_id, "status": job.status}
+
+@server.get("/joblens/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    """Devuelve el estado del trabajo; con `wait` espera hasta que termine (long-poll)"""
+    try:
+        job = await job_queue.wait(job_id, wait)
+    except KeyError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+    return job.to_dict()
+
 add_routes(
     server,
     simple_llm_chain,
@@ -0,0 +1,129 @@
+import io
+import os
+import random
+from typing import Dict, List, Tuple
+
+# Número de puestos de experiencia de cada tamaño de CV; los grandes ocupan varias páginas
+CV_SIZES = {"small": 2, "medium": 8, "large": 30}
+FORMATS = ("pdf", "docx", "txt")
+LINES_PER_PDF_PAGE = 55
+
+COMPANIES = ("Acme Analytics", "Nova Retail", "Grupo Andino", "Datalab", "Finexa", "Logística Pacífico")
+ROLES = ("Analista de datos", "Desarrollador backend", "Jefe de proyecto", "Ingeniero de software", "Consultor BI")
+TASKS = (
+    "Diseñé e implementé pipelines de datos en Python y SQL para reportes diarios",
+    "Lideré un equipo de cinco personas en la migración de servicios a la nube",
+    "Reduje en un 30% el tiempo de respuesta de la API optimizando consultas",
+    "Automaticé pruebas de integración y despliegues continuos con GitHub Actions",
+    "Coordiné con negocio la definición de indicadores y tableros en Power BI",
+)
+SKILLS = ("Python", "SQL", "Docker", "FastAPI", "Pandas", "AWS", "Git", "Power BI", "Kubernetes", "Spark")
+
+
+def build_cv_text(size: str, seed: int) -> str:
+    """Genera un CV sintético con contacto, experiencia, educación y habilidades"""
+    rng = random.Random(f"{size}:{seed}")
+    lines = [
+        f"Candidato {seed}",
+        f"candidato{seed}@example.com | +34 600 {seed:03d} {rng.randint(100, 999)}",
+        "",
+        "Perfil",
+        "Profesional orientado a resultados con experiencia en datos y desarrollo de software.",
+        "",
+        "Experiencia",
+    ]
+    for index in range(CV_SIZES[size]):
+        start = 2024 - 2 * (index + 1)
+        lines.append(f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({start} - {start + 2})")
+        lines.extend(f"• {task}" for task in rng.sample(TASKS, 3))
+        lines.append("")
+    lines.extend([
+        "Educación",
+        f"Ingeniería Informática - Universidad Nacional ({2008 + seed % 6} - {2013 + seed % 6})",
+        "",
+        "Habilidades",
+        ", ".join(rng.sample(SKILLS, 6)),
+        "",
+        "Certificaciones",
+        "AWS Certified Cloud Practitioner",
+    ])
+    return "\n".join(lines)
+
+
+def _escape_pdf_text(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(text: str) -> bytes:
+    """Escribe un PDF mínimo con texto extraíble, sin dependencias adicionales"""
+    lines = text.splitlines()
+    pages = [lines[i:i + LINES_PER_PDF_PAGE] for i in range(0, len(lines), LINES_PER_PDF_PAGE)] or [[]]
+
+    objects = []
+    page_ids = [4 + 2 * index for index in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for page_id, page_lines in zip(page_ids, pages):
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"({_escape_pdf_text(line)}) '" for line in page_lines) + " ET"
+        stream_bytes = stream.encode("cp1252", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream_bytes)} >>\nstream\n".encode() + stream_bytes + b"\nendstream")
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    output.write("".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode())
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return output.getvalue()
+
+
+def render_docx(text: str) -> bytes:
+    from docx import Document
+
+    document = Document()
+    for line in text.splitlines():
+        document.add_paragraph(line)
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def render(text: str, file_format: str) -> bytes:
+    if file_format == "pdf":
+        return render_pdf(text)
+    if file_format == "docx":
+        return render_docx(text)
+    return text.encode("utf-8")
+
+
+def build_corpus(per_combination: int = 2) -> List[Tuple[str, bytes, Dict[str, str]]]:
+    """Genera el corpus en memoria: (nombre de archivo, bytes, metadatos) por cada tamaño y formato"""
+    corpus = []
+    for size in CV_SIZES:
+        for file_format in FORMATS:
+            for seed in range(per_combination):
+                filename = f"cv_{size}_{seed}.{file_format}"
+                data = render(build_cv_text(size, seed), file_format)
+                corpus.append((filename, data, {"size": size, "format": file_format}))
+    return corpus
+
+
+def write_corpus(directory: str, per_combination: int = 2) -> List[str]:
+    """Escribe el corpus en disco para inspeccionarlo o reutilizarlo fuera del benchmark"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, data, _ in build_corpus(per_combination):
+        path = os.path.join(directory, filename)
+        with open(path, "wb") as corpus_file:
+            corpus_file.write(data)
+        paths.append(path)
+    return paths
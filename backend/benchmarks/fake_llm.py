@@ -0,0 +1,103 @@
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+WORDS = (
+    "experiencia liderazgo proyectos python análisis datos equipo resultados clientes "
+    "gestión mejora procesos comunicación formación certificación desarrollo impacto"
+).split()
+SECTION_KEYS_RE = re.compile(r"exactamente estas claves: (\[.*?\])")
+
+
+class FakeChatGroq(BaseChatModel):
+    """Sustituto determinista de ChatGroq con latencia y velocidad de generación configurables.
+
+    La respuesta depende solo del prompt, así que dos ejecuciones con el mismo corpus producen
+    el mismo trabajo; el tiempo es `latency_seconds` hasta el primer token más
+    `response_tokens / tokens_per_second` de generación.
+    """
+
+    latency_seconds: float = 0.3
+    tokens_per_second: float = 500.0
+    response_tokens: int = 250
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-groq"
+
+    def _response_for(self, prompt: str) -> str:
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+        def filler(words: int) -> str:
+            return " ".join(rng.choice(WORDS) for _ in range(words))
+
+        if '"is_cv_valid"' in prompt:
+            return json.dumps({"is_cv_valid": True})
+
+        match = SECTION_KEYS_RE.search(prompt)
+        if match is not None:
+            sections = json.loads(match.group(1))
+            words = max(1, self.response_tokens // max(1, len(sections)))
+            return json.dumps({section: filler(words) for section in sections}, ensure_ascii=False)
+
+        return f"Porcentaje de compatibilidad: {rng.randint(40, 95)}%\n{filler(self.response_tokens)}"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        content = self._response_for(messages[-1].content)
+        return re.findall(r"\S+\s*", content)
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency_seconds + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency_seconds + len(tokens) * self._token_delay())
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_seconds)
+        for token in self._tokens(messages):
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_seconds)
+        for token in self._tokens(messages):
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,264 @@
+"""Benchmark offline del pipeline de JobLens con un LLM simulado.
+
+Uso, desde `backend/`:
+
+    python -m benchmarks.run --concurrency 1,4,16 --latency 0.3 --tokens-per-second 500
+
+Mide el parseo y los embeddings del corpus sintético, la latencia por nodo de ambos grafos,
+el rendimiento a varios niveles de concurrencia, la ruta completa de la API y el pico de RSS.
+El modelo de embeddings debe estar ya en la caché local de Hugging Face.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import asyncio
+import resource
+import tempfile
+import statistics
+from collections import defaultdict
+from typing import Dict, List
+
+JOB_INFO = (
+    "Buscamos Ingeniero de software con experiencia en Python y SQL. "
+    "Requisitos: 3 años de experiencia en desarrollo backend, conocimientos de Docker y AWS. "
+    "Deseable experiencia liderando equipos y manejo de Power BI."
+)
+FEEDBACK = "Falta detallar logros en la experiencia y organizar las habilidades por categorías."
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark offline de JobLens")
+    parser.add_argument("--latency", type=float, default=0.3, help="Segundos hasta el primer token del LLM simulado")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Velocidad de generación simulada")
+    parser.add_argument("--response-tokens", type=int, default=250, help="Tokens de cada respuesta simulada")
+    parser.add_argument("--concurrency", default="1,4,16", help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--requests", type=int, default=32, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--per-combination", type=int, default=2, help="CV por cada tamaño y formato")
+    parser.add_argument("--llm-cache", action="store_true", help="Activa la caché de respuestas del LLM")
+    parser.add_argument("--skip-api", action="store_true", help="No mide la ruta completa de la API")
+    parser.add_argument("--output", help="Escribe los resultados en este archivo JSON")
+    return parser.parse_args()
+
+
+def configure_environment(workdir: str, args):
+    """Aísla las cachés y los almacenes en un directorio temporal; debe ejecutarse antes de importar la app"""
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+    os.environ["JOBLENS_LLM_CACHE"] = "true" if args.llm_cache else "false"
+    os.environ["JOBLENS_LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.sqlite3")
+    os.environ["JOBLENS_INDEX_CACHE_DIR"] = os.path.join(workdir, "cv_index_cache")
+    os.environ["JOBLENS_CHECKPOINT_DB_PATH"] = os.path.join(workdir, "checkpoints.sqlite3")
+    os.environ["JOBLENS_TEXT_STORE_PATH"] = os.path.join(workdir, "texts.sqlite3")
+    os.environ["JOBLENS_CANDIDATE_INDEX_DIR"] = os.path.join(workdir, "candidate_index")
+    # La cuota del proveedor no aplica al LLM simulado; se puede fijar por entorno para reproducirla
+    os.environ.setdefault("JOBLENS_LLM_REQUESTS_PER_MINUTE", "0")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "mean_ms": round(1000 * statistics.mean(values), 1) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 0.5), 1),
+        "p95_ms": round(1000 * percentile(values, 0.95), 1),
+    }
+
+
+def peak_rss_mb() -> float:
+    # En Linux ru_maxrss está en KiB; en macOS, en bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure_parsing_and_embeddings(corpus) -> dict:
+    from utils.document_parser import parse_document
+    from utils.embeddings import warm_up_embeddings
+    from utils.vector_store_manager import CVEmbeddingManager
+
+    parse_times, embed_times = defaultdict(list), defaultdict(list)
+    started = time.perf_counter()
+    warm_up_embeddings()
+    model_load_seconds = time.perf_counter() - started
+
+    manager = CVEmbeddingManager(storage="memory")
+    for filename, data, meta in corpus:
+        started = time.perf_counter()
+        document = parse_document(data, filename)
+        parse_times[meta["format"]].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        manager.embed_and_store_cv(document)
+        embed_times[meta["size"]].append(time.perf_counter() - started)
+
+    return {
+        "embedding_model_load_ms": round(1000 * model_load_seconds, 1),
+        "parse_by_format": {name: summarize(values) for name, values in parse_times.items()},
+        "embed_by_size": {name: summarize(values) for name, values in embed_times.items()},
+    }
+
+
+async def timed_run(graph, state: dict, config: dict) -> Dict[str, float]:
+    """Ejecuta el grafo y atribuye a cada nodo el tiempo transcurrido hasta su actualización"""
+    durations = defaultdict(float)
+    previous = time.perf_counter()
+    async for update in graph.astream(state, config=config):
+        now = time.perf_counter()
+        for node in update:
+            if node != "__end__":
+                durations[node] += now - previous
+        previous = now
+    return durations
+
+
+def fresh_config() -> dict:
+    from utils.config import make_thread_config
+    # Un hilo nuevo por ejecución para que ningún análisis reutilice el checkpoint de otro
+    return make_thread_config(f"bench:{uuid.uuid4().hex}")
+
+
+async def measure_node_latency(document_ids: List[str]) -> dict:
+    from api_server import build_analysis_state, build_improve_state
+    from utils.state_graph import app
+    from new_cv.state_graph import improve_cv_app
+
+    analysis_nodes, improve_nodes = defaultdict(list), defaultdict(list)
+    for index, document_id in enumerate(document_ids):
+        state = build_analysis_state({
+            "document_id": document_id,
+            "job_info": JOB_INFO,
+            "person_is_postuled_to_job": index % 2 == 0
+        })
+        for node, seconds in (await timed_run(app, state, fresh_config())).items():
+            analysis_nodes[node].append(seconds)
+
+        state = build_improve_state({"document_id": document_id, "feedback": FEEDBACK})
+        for node, seconds in (await timed_run(improve_cv_app, state, fresh_config())).items():
+            improve_nodes[node].append(seconds)
+
+    return {
+        "analysis": {node: summarize(values) for node, values in analysis_nodes.items()},
+        "improve_cv": {node: summarize(values) for node, values in improve_nodes.items()},
+    }
+
+
+async def measure_throughput(document_ids: List[str], levels: List[int], total_requests: int) -> dict:
+    from api_server import build_analysis_state
+    from utils.state_graph import app
+
+    async def analyze(index: int, semaphore: asyncio.Semaphore, latencies: List[float]):
+        state = build_analysis_state({
+            "document_id": document_ids[index % len(document_ids)],
+            "job_info": JOB_INFO,
+            "person_is_postuled_to_job": True
+        })
+        async with semaphore:
+            started = time.perf_counter()
+            await app.ainvoke(state, config=fresh_config())
+            latencies.append(time.perf_counter() - started)
+
+    results = {}
+    for level in levels:
+        semaphore, latencies = asyncio.Semaphore(level), []
+        started = time.perf_counter()
+        await asyncio.gather(*(analyze(index, semaphore, latencies) for index in range(total_requests)))
+        elapsed = time.perf_counter() - started
+        results[str(level)] = {
+            "requests_per_second": round(total_requests / elapsed, 2),
+            **summarize(latencies)
+        }
+    return results
+
+
+async def measure_api(corpus, concurrency: int) -> dict:
+    """Recorre la API completa en proceso: subida del CV y análisis por el stream NDJSON"""
+    import httpx
+    from api_server import server
+
+    upload_times, first_event_times, total_times = [], [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(client: httpx.AsyncClient, filename: str, data: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/joblens/documents", files={"file": (filename, data)})
+            response.raise_for_status()
+            upload_times.append(time.perf_counter() - started)
+
+            payload = {"input": {
+                "document_id": response.json()["document_id"],
+                "job_info": JOB_INFO,
+                "person_is_postuled_to_job": True
+            }}
+            started = time.perf_counter()
+            first_event = None
+            async with client.stream("POST", "/joblens/events", json=payload) as stream:
+                async for line in stream.aiter_lines():
+                    if not line:
+                        continue
+                    if first_event is None:
+                        first_event = time.perf_counter() - started
+                    if json.loads(line)["event"] == "error":
+                        raise RuntimeError(line)
+            first_event_times.append(first_event or 0.0)
+            total_times.append(time.perf_counter() - started)
+
+    async with httpx.AsyncClient(app=server, base_url="http://joblens.bench", timeout=None) as client:
+        await asyncio.gather(*(run_one(client, filename, data) for filename, data, _ in corpus))
+
+    return {
+        "concurrency": concurrency,
+        "upload": summarize(upload_times),
+        "first_event": summarize(first_event_times),
+        "analysis": summarize(total_times),
+    }
+
+
+async def run_benchmarks(args, corpus) -> dict:
+    from benchmarks.fake_llm import FakeChatGroq
+    from utils.llm import set_llm
+    from utils.document_store import document_store
+
+    set_llm(FakeChatGroq(
+        latency_seconds=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        response_tokens=args.response_tokens
+    ))
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    results = {"settings": vars(args), "corpus_documents": len(corpus)}
+    results["ingestion"] = measure_parsing_and_embeddings(corpus)
+
+    document_ids = [document_store.add(data, filename).document_id for filename, data, _ in corpus]
+    results["node_latency"] = await measure_node_latency(document_ids)
+    results["throughput"] = await measure_throughput(document_ids, levels, args.requests)
+    if not args.skip_api:
+        results["api"] = await measure_api(corpus, max(levels))
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="joblens-bench-") as workdir:
+        configure_environment(workdir, args)
+        from benchmarks.corpus import build_corpus
+
+        corpus = build_corpus(args.per_combination)
+        results = asyncio.run(run_benchmarks(args, corpus))
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import re
+import json
+from typing import Dict, List, Optional
+from utils.cv_heuristics import SECTION_KEYWORDS, heading_section
+
+SECTION_TITLES = {
+    "personal_info": "Información Personal",
+    "experience": "Experiencia Profesional",
+    "education": "Educación",
+    "skills": "Habilidades Técnicas",
+    "achievements": "Certificaciones y Logros",
+}
+BULLET_RE = re.compile(r"^\s*(?:[-*·●▪◦•]|\d+[.)])\s+")
+
+
+def target_sections(feedback: str, sections: Dict[str, str]) -> List[str]:
+    """Devuelve las secciones que menciona el feedback; si no menciona ninguna, todas"""
+    feedback = (feedback or "").lower()
+    targeted = [
+        section for section in sections
+        if any(keyword in feedback for keyword in SECTION_KEYWORDS.get(section, ()))
+    ]
+    return targeted or list(sections)
+
+
+def parse_structured_sections(response: str, expected: List[str]) -> Dict[str, str]:
+    """Extrae del JSON del LLM el contenido de las secciones esperadas; ignora las que falten"""
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if match is None:
+        return {}
+    try:
+        result = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(result, dict):
+        return {}
+
+    sections = {}
+    for section in expected:
+        content = result.get(section)
+        if isinstance(content, list):
+            content = "\n".join(f"• {item}" for item in content if isinstance(item, str) and item.strip())
+        if isinstance(content, str) and content.strip():
+            sections[section] = content.strip()
+    return sections
+
+
+def _format_lines(section: str, content: str) -> List[str]:
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+    # El título se pone al renderizar; se quita si la sección ya lo trae
+    if lines and heading_section(lines[0]) == section:
+        lines = lines[1:]
+    return [BULLET_RE.sub("• ", line) for line in lines]
+
+
+def render_cv(sections: Dict[str, str], titles: Optional[Dict[str, str]] = None) -> str:
+    """Compone el CV final en Markdown de forma determinista a partir de sus secciones"""
+    titles = titles or SECTION_TITLES
+    blocks = []
+    for section, content in sections.items():
+        lines = _format_lines(section, content or "")
+        if not lines:
+            continue
+        title = titles.get(section)
+        blocks.append("\n".join(([f"## {title}", ""] if title else []) + lines))
+    return "\n\n".join(blocks)
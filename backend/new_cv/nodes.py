@@ -1,60 +1,59 @@
 from new_cv.react_state import ImproveCVState
 from utils.vector_store_manager import CVEmbeddingManager
-from langchain_core.messages import HumanMessage
-from langchain_groq import ChatGroq
-from utils.config import THREAD_CONFIG
+from utils.document_store import load_parsed_cv
+from utils.section_retrieval import extract_sections
+from utils.executor import run_blocking
+from utils.llm import generate, generate_with_model, primary_model, cache_lookup, cache_store
+from utils.token_budget import budget_inputs, budget_sections
+from utils.config import IMPROVE_CV_TARGETED
+from new_cv.formatting import SECTION_TITLES, target_sections, parse_structured_sections, render_cv
 import os
 import json
+import asyncio
 
-llm = ChatGroq(model="llama-3.1-8b-instant")
+def _retrieve_cv_sections(document_id: str, cv_file_path: str) -> dict:
+    document = load_parsed_cv(document_id, cv_file_path)
+    cv_manager = CVEmbeddingManager()
+    vectors = cv_manager.embed_and_store_cv(document)
+    return extract_sections(vectors, document.text)
 
-def extract_cv_sections(state: ImproveCVState):
-    """Extrae las secciones del CV usando el índice FAISS existente"""
+async def extract_cv_sections(state: ImproveCVState):
+    """Extrae las secciones del CV usando el índice FAISS propio del documento"""
     print("1. Extrayendo secciones del CV...")
+
+    if state.get("cv_sections"):
+        print("Secciones ya extraídas para este CV, se reutilizan.")
+        return {"cv_sections": state["cv_sections"]}
     
-    faiss_path = "cv_faiss_index"
-    if os.path.exists(faiss_path):
-        print("Usando índice FAISS existente...")
-        cv_manager = CVEmbeddingManager(faiss_path)
-        retriever = cv_manager.get_retriever(k=10)
-        
-        sections = {}
-        section_queries = {
-            "personal_info": "información personal nombre contacto teléfono email",
-            "experience": "experiencia laboral trabajo empresa puesto responsabilidades",
-            "education": "educación formación académica universidad estudios título",
-            "skills": "habilidades competencias técnicas lenguajes programación",
-            "achievements": "logros certificaciones premios reconocimientos"
-        }
-        
-        for section, query in section_queries.items():
-            docs = retriever.invoke(query)
-            sections[section] = "\n".join([doc.page_content for doc in docs[:3]])
+    document_id = state.get("document_id", "")
+    cv_file_path = state["cv_file_path"]
+    if document_id or (cv_file_path and os.path.exists(cv_file_path)):
+        print("Usando el índice FAISS del documento...")
+        sections = await run_blocking(_retrieve_cv_sections, document_id, cv_file_path)
     else:
-        print("No existe índice FAISS, usando contenido original...")
+        print("No existe el documento del CV, usando contenido original...")
         sections = {"raw_content": state["cv_content"]}
     
-    return {
-        "cv_sections": sections,
-        "cv_content": state["cv_content"],
-        "feedback": state["feedback"]
-    }
+    return {"cv_sections": sections}
 
-def improve_cv_structure(state: ImproveCVState):
+async def improve_cv_structure(state: ImproveCVState):
     """Mejora la estructura del CV basado en el feedback"""
     print("2. Mejorando estructura del CV...")
     
     cv_sections = state["cv_sections"]
     feedback = state["feedback"]
+    prompt_sections, sections_report = await run_blocking(budget_sections, "improve_structure", cv_sections)
+    inputs, token_report = await run_blocking(budget_inputs, "improve_structure", feedback=feedback)
+    token_report["cv_sections"] = sections_report
     
     improvement_prompt = f"""
     Basándote en el siguiente feedback y las secciones del CV, crea una versión mejorada:
 
     FEEDBACK RECIBIDO:
-    {feedback}
+    {inputs["feedback"]}
 
     SECCIONES DEL CV:
-    {json.dumps(cv_sections, indent=2, ensure_ascii=False)}
+    {json.dumps(prompt_sections, ensure_ascii=False)}
 
     INSTRUCCIONES:
     1. Corrige todas las deficiencias mencionadas en el feedback
@@ -71,25 +70,23 @@ def improve_cv_structure(state: ImproveCVState):
     Responde ÚNICAMENTE con el CV mejorado en formato texto plano, bien estructurado.
     """
     
-    response = llm.invoke([HumanMessage(content=improvement_prompt)], config=THREAD_CONFIG)
-    improved_content = response.content
+    improved_content = await generate(improvement_prompt, node="improve_structure")
     
     return {
         "improved_cv": improved_content,
-        "cv_sections": cv_sections,
-        "feedback": feedback
+        "token_usage": {"improve_structure": token_report}
     }
 
-def format_improved_cv(state: ImproveCVState):
+async def format_improved_cv(state: ImproveCVState):
     """Formatea el CV mejorado para mejor presentación"""
     print("3. Formateando CV mejorado...")
     
-    improved_cv = state["improved_cv"]
+    inputs, token_report = await run_blocking(budget_inputs, "format_cv", improved_cv=state["improved_cv"])
     
     formatting_prompt = f"""
     Toma el siguiente CV mejorado y dale un formato profesional final:
 
-    {improved_cv}
+    {inputs["improved_cv"]}
 
     INSTRUCCIONES DE FORMATO:
     1. Asegúrate de que tenga títulos claros y bien definidos
@@ -102,9 +99,79 @@ def format_improved_cv(state: ImproveCVState):
     Responde ÚNICAMENTE con el CV final formateado.
     """
     
-    response = llm.invoke([HumanMessage(content=formatting_prompt)], config=THREAD_CONFIG)
-    final_cv = response.content
+    final_cv = await generate(formatting_prompt, node="format_cv")
     
     return {
-        "improved_cv": final_cv
-    }
\ No newline at end of file
+        "improved_cv": final_cv,
+        "token_usage": {"format_cv": token_report}
+    }
+
+async def improve_cv_sections(state: ImproveCVState):
+    """Mejora el CV con una sola llamada que devuelve JSON por sección y lo formatea localmente"""
+    print("2. Mejorando las secciones del CV...")
+
+    cv_sections = state["cv_sections"]
+    feedback = state["feedback"]
+    targets = target_sections(feedback, cv_sections) if IMPROVE_CV_TARGETED else list(cv_sections)
+
+    # Cada sección se cachea por separado, así que solo se piden al LLM las que no estén en caché
+    lookups = dict(zip(targets, await asyncio.gather(*(
+        cache_lookup(
+            "improve_section",
+            {"section": section, "content": cv_sections[section], "feedback": feedback},
+            llm_node="improve_sections"
+        )
+        for section in targets
+    ))))
+    improved = {
+        section: lookup.response
+        for section, lookup in lookups.items()
+        if lookup is not None and lookup.response is not None
+    }
+    pending = [section for section in targets if section not in improved]
+
+    token_report = {}
+    if pending:
+        prompt_sections, sections_report = await run_blocking(
+            budget_sections, "improve_sections", {section: cv_sections[section] for section in pending}
+        )
+        inputs, token_report = await run_blocking(budget_inputs, "improve_sections", feedback=feedback)
+        token_report["cv_sections"] = sections_report
+        section_names = {section: SECTION_TITLES.get(section, section) for section in pending}
+
+        improvement_prompt = f"""
+    Basándote en el siguiente feedback, reescribe las secciones del CV:
+
+    FEEDBACK RECIBIDO:
+    {inputs["feedback"]}
+
+    SECCIONES DEL CV:
+    {json.dumps(prompt_sections, ensure_ascii=False)}
+
+    INSTRUCCIONES:
+    1. Corrige todas las deficiencias mencionadas en el feedback
+    2. Mantén cada contenido en su sección: {json.dumps(section_names, ensure_ascii=False)}
+    3. Experiencia con fechas, empresa y logros específicos; habilidades organizadas por categorías
+    4. Usa una línea por elemento, sin títulos de sección ni formato Markdown
+    5. Mejora la redacción para hacerla más impactante
+
+    Responde ÚNICAMENTE con un objeto JSON con exactamente estas claves: {json.dumps(pending)}.
+    El valor de cada clave es el texto mejorado de esa sección.
+    """
+
+        response, model_name = await generate_with_model(improvement_prompt, node="improve_sections")
+        generated = parse_structured_sections(response, pending)
+        if len(generated) < len(pending):
+            print("Respuesta estructurada incompleta, se conserva el contenido original de las secciones que faltan.")
+
+        # Las secciones del modelo alternativo no se guardan bajo la clave del principal
+        if model_name == primary_model("improve_sections"):
+            await asyncio.gather(*(cache_store(lookups[section], content) for section, content in generated.items()))
+        improved.update(generated)
+
+    sections = {section: improved.get(section, content) for section, content in cv_sections.items()}
+    return {
+        "improved_sections": sections,
+        "improved_cv": render_cv(sections),
+        "token_usage": {"improve_sections": token_report}
+    }
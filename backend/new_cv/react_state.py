@@ -1,8 +1,12 @@
-from typing import TypedDict
+from typing import TypedDict, Annotated, Optional
+from utils.token_budget import merge_token_usage
 
 class ImproveCVState(TypedDict):
     cv_content: str
     feedback: str
     cv_file_path: str
+    document_id: Optional[str]
     improved_cv: str
-    cv_sections: dict
\ No newline at end of file
+    cv_sections: dict
+    improved_sections: dict
+    token_usage: Annotated[dict, merge_token_usage]
@@ -1,23 +1,48 @@
 from new_cv.react_state import ImproveCVState
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from utils.checkpointer import get_checkpointer
+from utils.metrics import timed_node
+from utils.config import IMPROVE_CV_MODE
 from new_cv.nodes import (
     extract_cv_sections,
+    improve_cv_sections,
     improve_cv_structure,
     format_improved_cv
 )
 
-improve_workflow = StateGraph(ImproveCVState)
+def build_two_pass_workflow():
+    """Mejora el CV en texto libre y después pide al LLM que lo formatee"""
+    workflow = StateGraph(ImproveCVState)
 
-improve_workflow.add_node("extract_sections", extract_cv_sections)
-improve_workflow.add_node("improve_structure", improve_cv_structure)
-improve_workflow.add_node("format_cv", format_improved_cv)
+    workflow.add_node("extract_sections", timed_node("extract_sections", extract_cv_sections))
+    workflow.add_node("improve_structure", timed_node("improve_structure", improve_cv_structure))
+    workflow.add_node("format_cv", timed_node("format_cv", format_improved_cv))
 
-improve_workflow.set_entry_point("extract_sections")
-improve_workflow.add_edge("extract_sections", "improve_structure")
-improve_workflow.add_edge("improve_structure", "format_cv")
-improve_workflow.add_edge("format_cv", END)
+    workflow.set_entry_point("extract_sections")
+    workflow.add_edge("extract_sections", "improve_structure")
+    workflow.add_edge("improve_structure", "format_cv")
+    workflow.add_edge("format_cv", END)
+    return workflow
 
-improve_checkpointer = MemorySaver()
+def build_structured_workflow():
+    """Mejora las secciones con una sola llamada estructurada; el formato se aplica localmente"""
+    workflow = StateGraph(ImproveCVState)
 
-improve_cv_app = improve_workflow.compile(checkpointer=improve_checkpointer)
\ No newline at end of file
+    workflow.add_node("extract_sections", timed_node("extract_sections", extract_cv_sections))
+    workflow.add_node("improve_sections", timed_node("improve_sections", improve_cv_sections))
+
+    workflow.set_entry_point("extract_sections")
+    workflow.add_edge("extract_sections", "improve_sections")
+    workflow.add_edge("improve_sections", END)
+    return workflow
+
+if IMPROVE_CV_MODE == "two_pass":
+    improve_workflow = build_two_pass_workflow()
+elif IMPROVE_CV_MODE == "structured":
+    improve_workflow = build_structured_workflow()
+else:
+    raise ValueError(f"Modo de mejora de CV no soportado: {IMPROVE_CV_MODE}")
+
+improve_checkpointer = get_checkpointer()
+
+improve_cv_app = improve_workflow.compile(checkpointer=improve_checkpointer)
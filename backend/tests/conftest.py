@@ -0,0 +1,58 @@
+import os
+import sys
+import uuid
+import tempfile
+import pytest
+
+# La configuración se lee al importar, así que los almacenes se aíslan antes de cargar la app
+_workdir = tempfile.mkdtemp(prefix="joblens-test-")
+os.environ.update({
+    "HF_HUB_OFFLINE": "1",
+    "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "test"),
+    "JOBLENS_CHECKPOINT_BACKEND": "sqlite",
+    "JOBLENS_CHECKPOINT_DB_PATH": os.path.join(_workdir, "checkpoints.sqlite3"),
+    "JOBLENS_TEXT_STORE_PATH": os.path.join(_workdir, "texts.sqlite3"),
+    "JOBLENS_DOCUMENT_STORE_PATH": os.path.join(_workdir, "documents.sqlite3"),
+    "JOBLENS_LLM_CACHE_PATH": os.path.join(_workdir, "llm_cache.sqlite3"),
+    "JOBLENS_INDEX_CACHE_DIR": os.path.join(_workdir, "cv_index_cache"),
+    "JOBLENS_CANDIDATE_INDEX_DIR": os.path.join(_workdir, "candidate_index"),
+    "JOBLENS_LLM_REQUESTS_PER_MINUTE": "0",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_llm import FakeChatGroq  # noqa: E402
+from utils.document_store import document_store  # noqa: E402
+from utils.llm import set_llm  # noqa: E402
+
+CV_TEXT = """Ana Torres
+ana.torres@example.com | +34 600 123 456
+
+Experiencia
+Ingeniera de software en Acme (2019 - 2023). Desarrollo de servicios backend en Python y SQL,
+diseño de APIs REST, migración de la infraestructura a contenedores Docker en AWS y mentoría
+de dos desarrolladoras junior. Reduje un 40% el tiempo de respuesta de la API de pedidos.
+
+Educación
+Grado en Ingeniería Informática, Universidad de Sevilla (2015 - 2019). Trabajo de fin de grado
+sobre recuperación de información con índices vectoriales.
+
+Habilidades
+Python, SQL, Docker, AWS, FastAPI, PostgreSQL, pruebas automatizadas e integración continua.
+"""
+
+
+@pytest.fixture
+def fake_llm():
+    llm = FakeChatGroq(latency_seconds=0, tokens_per_second=0, response_tokens=20)
+    set_llm(llm)
+    yield llm
+    set_llm(None)
+
+
+@pytest.fixture
+def upload_cv():
+    """Sube un CV al almacén de documentos; cada llamada usa un contenido distinto y, por tanto, su propio hilo"""
+    def upload(text: str = CV_TEXT) -> str:
+        data = f"{text}\nReferencia: {uuid.uuid4().hex}\n".encode("utf-8")
+        return document_store.add(data, "cv.txt").document_id
+    return upload
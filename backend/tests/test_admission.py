@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import api_server
+from utils.admission import AdmissionController, Overloaded
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        admission = AdmissionController(max_active=1, max_queued=0, queue_timeout=5)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire()
+        admission.release()
+        await admission.acquire()
+        return rejected.value
+
+    error = asyncio.run(scenario())
+
+    assert error.reason == "queue_full" and error.retry_after == 5
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        admission = AdmissionController(max_active=1, max_queued=1, queue_timeout=0.05)
+        await admission.acquire()
+        reasons = []
+        # Una espera agotada libera su puesto en la cola: la siguiente vuelve a esperar en lugar de rechazarse
+        for _ in range(2):
+            with pytest.raises(Overloaded) as rejected:
+                await admission.acquire()
+            reasons.append((rejected.value.reason, rejected.value.retry_after))
+        return reasons
+
+    assert asyncio.run(scenario()) == [("queue_timeout", 1), ("queue_timeout", 1)]
+
+
+def test_graph_routes_answer_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(api_server, "admission", AdmissionController(max_active=0, max_queued=0, queue_timeout=3))
+    client = TestClient(api_server.server)
+
+    response = client.post("/joblens/screen", json={"job_info": "Backend Python", "document_ids": []})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    # Las rutas ligeras no pasan por la cola
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,65 @@
+import re
+import zlib
+import numpy as np
+from conftest import CV_TEXT
+from utils import candidate_index
+from utils.candidate_index import CandidateIndex
+from utils.document_parser import parse_document
+
+DESIGNER_CV = CV_TEXT.replace("Python, SQL, Docker, AWS, FastAPI, PostgreSQL", "Figma, Sketch, prototipado, diseño de interfaces")
+
+
+class HashingEmbeddings:
+    """Embeddings deterministas por bolsa de palabras, sin descargar el modelo"""
+    dimension = 64
+
+    def embed_documents(self, texts):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, zlib.crc32(word.encode("utf-8")) % self.dimension] += 1
+        return (vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)).tolist()
+
+
+def make_index(tmp_path, monkeypatch) -> CandidateIndex:
+    monkeypatch.setattr(candidate_index, "get_embeddings", HashingEmbeddings)
+    return CandidateIndex(index_dir=str(tmp_path), save_interval_seconds=3600)
+
+
+def test_upsert_replaces_chunks_and_delete_removes_them(tmp_path, monkeypatch):
+    index = make_index(tmp_path, monkeypatch)
+    document = parse_document(CV_TEXT.encode("utf-8"), "ana.txt")
+
+    added = index.upsert("ana", document)
+    assert index.upsert("ana", document) == added
+    assert index.stats() == {"documents": 1, "vectors": added, "index_type": "flat", "compression": "none"}
+
+    assert index.delete("ana") == added
+    assert not index.contains("ana") and index.stats()["vectors"] == 0
+    assert index.delete("ana") == 0
+
+
+def test_search_ranks_the_matching_cv_first(tmp_path, monkeypatch):
+    index = make_index(tmp_path, monkeypatch)
+    index.upsert("ana", parse_document(CV_TEXT.encode("utf-8"), "ana.txt"))
+    index.upsert("lucia", parse_document(DESIGNER_CV.encode("utf-8"), "lucia.txt"))
+
+    results = index.search("Experiencia con Figma y Sketch. Diseño de interfaces.", k=2)
+
+    assert [result["document_id"] for result in results] == ["lucia", "ana"]
+    assert "skills" in results[0]["matched_sections"]
+
+
+def test_reconcile_drops_cvs_whose_vectors_were_not_saved(tmp_path, monkeypatch):
+    index = make_index(tmp_path, monkeypatch)
+    index.upsert("ana", parse_document(CV_TEXT.encode("utf-8"), "ana.txt"))
+    index.save()
+    # Los metadatos de este CV se confirman, pero el proceso termina antes del siguiente guardado del índice
+    index.upsert("lucia", parse_document(DESIGNER_CV.encode("utf-8"), "lucia.txt"))
+    index._lock_file.close()
+
+    reopened = make_index(tmp_path, monkeypatch)
+
+    assert reopened.contains("ana") and not reopened.contains("lucia")
+    assert reopened.stats()["documents"] == 1
+    assert reopened.upsert("lucia", parse_document(DESIGNER_CV.encode("utf-8"), "lucia.txt")) > 0
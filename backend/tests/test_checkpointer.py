@@ -0,0 +1,59 @@
+import asyncio
+from api_server import build_analysis_state, build_thread_config
+from utils.checkpointer import get_checkpointer
+from utils.state_graph import app, build_parallel_workflow
+
+
+def test_analysis_resumes_from_sqlite_checkpoint(fake_llm, upload_cv):
+    document_id = upload_cv()
+
+    async def analyze():
+        state = build_analysis_state({"document_id": document_id, "person_is_postuled_to_job": False})
+        config = build_thread_config("analysis", state)
+        return await app.ainvoke(state, config=config), config
+
+    first, config = asyncio.run(analyze())
+    second, _ = asyncio.run(analyze())
+
+    assert first["summary"] and second["summary"]
+    # La segunda ejecución reutiliza la extracción guardada en lugar de volver a extraer el CV
+    assert second["cv_content_ref"] == first["cv_content_ref"]
+    saved = get_checkpointer().get_tuple(config)
+    assert saved is not None and saved.checkpoint["channel_values"]["is_cv_valid"] is True
+    assert len(list(get_checkpointer().list(config))) <= get_checkpointer().max_per_thread
+
+
+def test_invalid_cv_drops_speculative_draft_message(fake_llm, upload_cv):
+    document_id = upload_cv("Lista de la compra: pan, leche y huevos.")
+    parallel_app = build_parallel_workflow().compile(checkpointer=get_checkpointer())
+
+    async def analyze():
+        state = build_analysis_state({"document_id": document_id, "person_is_postuled_to_job": False})
+        return await parallel_app.ainvoke(state, config=build_thread_config("analysis", state))
+
+    result = asyncio.run(analyze())
+
+    assert result["is_cv_valid"] is False and result["feedback"] and not result["summary"]
+    # El resumen especulativo se descarta también del historial que se guarda en el checkpoint
+    assert not any(message.content.startswith("Resumen del CV") for message in result["messages"])
+
+
+def test_resumed_run_starts_with_fresh_token_usage_and_messages(fake_llm, upload_cv):
+    document_id = upload_cv()
+
+    async def analyze(person_is_postuled_to_job: bool):
+        state = build_analysis_state({
+            "document_id": document_id,
+            "person_is_postuled_to_job": person_is_postuled_to_job,
+            "job_info": "Buscamos ingeniera backend con Python y AWS."
+        })
+        return await app.ainvoke(state, config=build_thread_config("analysis", state))
+
+    asyncio.run(analyze(False))
+    second = asyncio.run(analyze(True))
+
+    assert set(second["token_usage"]) == {"analyze_compatibility"}
+    # El historial del hilo solo contiene los mensajes de la última ejecución
+    assert [message.content.split(":")[0] for message in second["messages"]] == [
+        "Analizar CV", "Análisis de compatibilidad"
+    ]
@@ -0,0 +1,37 @@
+from conftest import CV_TEXT
+from utils.cv_heuristics import classify_cv, heading_section, lean_cv_validity, looks_like_phone, split_sections
+
+AMBIGUOUS_TEXT = " ".join(["Persona responsable y con ganas de aprender en un equipo dinámico."] * 8) + " ana@example.com"
+
+
+def test_classify_cv_decides_only_the_evident_cases():
+    assert classify_cv(CV_TEXT) is True
+    assert classify_cv("Lista de la compra: pan, leche y huevos.") is False
+    assert classify_cv(" ".join(["Receta de tortilla con patatas y cebolla."] * 10)) is False
+    assert classify_cv(AMBIGUOUS_TEXT) is None
+
+
+def test_lean_cv_validity_needs_three_signals():
+    assert lean_cv_validity(CV_TEXT) is True
+    assert lean_cv_validity(AMBIGUOUS_TEXT) is False
+
+
+def test_looks_like_phone_rejects_year_ranges():
+    assert looks_like_phone("+34 600 123 456")
+    assert looks_like_phone("600 123 456")
+    assert not looks_like_phone("2019 - 2023")
+    assert not looks_like_phone("12 34 56")
+
+
+def test_heading_section_matches_whole_short_headings():
+    assert heading_section("## Experiencia Profesional:") == "experience"
+    assert heading_section("Educación y certificaciones") == "education"
+    assert heading_section("Tengo experiencia en equipos de producto distribuidos por Europa") is None
+    assert heading_section("") is None
+
+
+def test_split_sections_keeps_preamble_as_personal_info():
+    sections = split_sections(CV_TEXT)
+
+    assert [section for section, _ in sections] == ["personal_info", "experience", "education", "skills"]
+    assert sections[0][1].startswith("Ana Torres")
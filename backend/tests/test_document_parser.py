@@ -0,0 +1,23 @@
+from benchmarks.corpus import build_cv_text, render_pdf
+from utils import document_parser
+from utils.document_parser import parse_document
+
+
+def test_parallel_pdf_extraction_matches_sequential(monkeypatch):
+    pdf = render_pdf("\n".join(build_cv_text("large", seed) for seed in range(3)))
+
+    monkeypatch.setattr(document_parser, "PDF_PARSE_WORKERS", 1)
+    sequential = document_parser._parse_pdf(pdf)
+    monkeypatch.setattr(document_parser, "PDF_PARSE_WORKERS", 2)
+    monkeypatch.setattr(document_parser, "PDF_PARALLEL_MIN_PAGES", 2)
+    parallel = document_parser._parse_pdf(pdf)
+
+    assert len(sequential) > 2 and parallel == sequential
+
+
+def test_documents_are_hashed_by_content_not_name():
+    first = parse_document("Ana Torres\nExperiencia".encode("utf-8"), "cv.txt")
+    second = parse_document("Ana Torres\nExperiencia".encode("utf-8"), "copia.txt")
+
+    assert first.text == "Ana Torres\nExperiencia"
+    assert second.content_hash == first.content_hash
@@ -0,0 +1,34 @@
+import time
+import pytest
+from utils.document_store import DocumentStore
+
+
+def test_documents_are_shared_between_workers(tmp_path):
+    db_path = str(tmp_path / "documents.sqlite3")
+    # Dos instancias sobre la misma base de datos se comportan como dos workers de uvicorn
+    first_worker, second_worker = DocumentStore(db_path), DocumentStore(db_path)
+
+    document = first_worker.add(b"Ana Torres - CV", "cv.txt")
+
+    assert second_worker.get(document.document_id).data == b"Ana Torres - CV"
+    assert first_worker.add(b"Ana Torres - CV", "copia.txt").document_id == document.document_id
+    assert second_worker.delete(document.document_id)
+    with pytest.raises(KeyError):
+        first_worker.get(document.document_id)
+
+
+def test_idle_and_oversized_documents_are_evicted(tmp_path):
+    store = DocumentStore(str(tmp_path / "documents.sqlite3"), ttl_seconds=3600, max_bytes=10)
+    oldest = store.add(b"123456", "a.txt")
+    time.sleep(0.01)
+    newest = store.add(b"abcdef", "b.txt")
+
+    with pytest.raises(KeyError):
+        store.get(oldest.document_id)
+    assert store.get(newest.document_id).filename == "b.txt"
+
+    expiring = DocumentStore(str(tmp_path / "expiring.sqlite3"), ttl_seconds=0)
+    document = expiring.add(b"CV", "cv.txt")
+    time.sleep(0.01)
+    with pytest.raises(KeyError):
+        expiring.get(document.document_id)
@@ -0,0 +1,39 @@
+from new_cv.formatting import parse_structured_sections, render_cv, target_sections
+
+
+def test_parse_structured_sections_reads_json_inside_prose():
+    response = (
+        "Aquí tienes el CV mejorado:\n"
+        '{"experience": "Ingeniera backend en Acme", "skills": ["Python", " ", "SQL"], "education": ""}\n'
+        "¡Suerte!"
+    )
+
+    sections = parse_structured_sections(response, ["experience", "skills", "education", "achievements"])
+
+    assert sections == {"experience": "Ingeniera backend en Acme", "skills": "• Python\n• SQL"}
+
+
+def test_parse_structured_sections_ignores_unusable_responses():
+    assert parse_structured_sections("Sin JSON", ["skills"]) == {}
+    assert parse_structured_sections('{"skills": "Python",}', ["skills"]) == {}
+    assert parse_structured_sections('{"skills": 3}', ["skills"]) == {}
+
+
+def test_render_cv_adds_titles_and_normalizes_bullets():
+    markdown = render_cv({
+        "experience": "Experiencia\n- Backend en Acme\n2) Mentoría",
+        "skills": "",
+        "raw_content": "Texto sin sección",
+    })
+
+    assert markdown == (
+        "## Experiencia Profesional\n\n• Backend en Acme\n• Mentoría\n\n"
+        "Texto sin sección"
+    )
+
+
+def test_target_sections_follows_the_feedback():
+    sections = {"experience": "...", "skills": "...", "education": "..."}
+
+    assert target_sections("Añade tecnologías concretas a tus habilidades", sections) == ["skills"]
+    assert target_sections("Buen CV en general", sections) == list(sections)
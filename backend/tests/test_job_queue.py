@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import api_server
+from utils.admission import Overloaded
+from utils.job_queue import JobQueue
+
+
+async def echo(payload: dict) -> dict:
+    if payload.get("fail"):
+        raise RuntimeError("El grafo falló")
+    return {"echo": payload["value"]}
+
+
+def make_queue(**options) -> JobQueue:
+    queue = JobQueue(**{"workers": 1, "max_queued": 10, "result_ttl": 60, "max_retained": 10, **options})
+    queue.register("echo", echo)
+    return queue
+
+
+def test_jobs_report_their_result_or_error():
+    async def scenario():
+        queue = make_queue()
+        succeeded = queue.submit("echo", {"value": 1})
+        failed = queue.submit("echo", {"fail": True})
+        results = [await queue.wait(succeeded.job_id, 5), await queue.wait(failed.job_id, 5)]
+        await queue.stop()
+        return [job.to_dict() for job in results]
+
+    succeeded, failed = asyncio.run(scenario())
+
+    assert succeeded["status"] == "succeeded" and succeeded["output"] == {"echo": 1}
+    assert failed["status"] == "failed" and failed["error"] == "El grafo falló" and failed["output"] is None
+
+
+def test_full_queue_and_unknown_kind_are_rejected():
+    async def scenario():
+        # Sin workers los trabajos se quedan en cola
+        queue = make_queue(workers=0, max_queued=1)
+        queue.submit("echo", {"value": 1})
+        with pytest.raises(Overloaded) as rejected:
+            queue.submit("echo", {"value": 2})
+        with pytest.raises(ValueError):
+            queue.submit("desconocido", {})
+        return rejected.value
+
+    assert asyncio.run(scenario()).reason == "job_queue_full"
+
+
+def test_finished_jobs_beyond_the_retention_limit_are_purged():
+    async def scenario():
+        queue = make_queue(max_retained=1)
+        first = await queue.wait(queue.submit("echo", {"value": 1}).job_id, 5)
+        second = await queue.wait(queue.submit("echo", {"value": 2}).job_id, 5)
+        await queue.stop()
+        return queue, first, second
+
+    queue, first, second = asyncio.run(scenario())
+
+    assert queue.get(second.job_id).finished
+    with pytest.raises(KeyError):
+        queue.get(first.job_id)
+
+
+def test_analysis_job_endpoints(fake_llm, upload_cv):
+    document_id = upload_cv()
+
+    with TestClient(api_server.server) as client:
+        submitted = client.post("/joblens/jobs", json={
+            "kind": "analysis", "input": {"document_id": document_id, "person_is_postuled_to_job": False}
+        })
+        assert submitted.status_code == 202
+        job = client.get(f"/joblens/jobs/{submitted.json()['job_id']}", params={"wait": 25}).json()
+
+        assert client.post("/joblens/jobs", json={"kind": "otro", "input": {}}).status_code == 400
+        assert client.post("/joblens/jobs", json={
+            "kind": "analysis", "input": {"document_id": "caducado"}
+        }).status_code == 404
+        assert client.get("/joblens/jobs/desconocido").status_code == 404
+
+    assert job["status"] == "succeeded", job["error"]
+    assert job["output"]["is_cv_valid"] is True and job["output"]["document_id"] == document_id
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from utils import llm_pool
+from utils.admission import client_identity
+from utils.llm_pool import LLMPool, LLMStreamInterrupted
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def run_calls(pool: LLMPool, failures: list) -> tuple:
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if failures:
+            raise failures.pop(0)
+        return "ok"
+
+    async def run():
+        return await pool.run(call, node="test", prompt_tokens=10)
+
+    return asyncio.run(run()), calls
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_pool, "retry_delay", lambda error, attempt: 0)
+
+
+def test_transient_errors_are_retried():
+    result, calls = run_calls(LLMPool(requests_per_minute=0, retry_attempts=3), [RateLimited(), asyncio.TimeoutError()])
+    assert result == "ok" and len(calls) == 3
+
+
+def test_retries_stop_after_the_configured_attempts():
+    with pytest.raises(RateLimited):
+        run_calls(LLMPool(requests_per_minute=0, retry_attempts=2), [RateLimited() for _ in range(5)])
+
+
+@pytest.mark.parametrize("error", [ValueError("prompt inválido"), LLMStreamInterrupted("stream cortado")])
+def test_permanent_errors_are_not_retried(error):
+    with pytest.raises(type(error)):
+        run_calls(LLMPool(requests_per_minute=0, retry_attempts=3), [error])
+
+
+def test_quota_wait_does_not_hold_a_global_slot():
+    pool = LLMPool(max_concurrency=1, requests_per_minute=1)
+
+    async def run():
+        pool._request_bucket.available = 0
+        waiting = asyncio.create_task(pool.run(lambda: asyncio.sleep(0), node="test", prompt_tokens=10))
+        await asyncio.sleep(0.05)
+        # La llamada espera cuota sin ocupar el único hueco global
+        assert not waiting.done() and not pool._global.locked()
+        waiting.cancel()
+
+    asyncio.run(run())
+
+
+def test_client_header_only_counts_for_trusted_peers():
+    assert client_identity("203.0.113.7", "otro-id", trusted_peers=("127.0.0.1",)) == "203.0.113.7"
+    assert client_identity("127.0.0.1", "sesion-1", trusted_peers=("127.0.0.1",)) == "127.0.0.1/sesion-1"
+    assert client_identity("127.0.0.1", "", trusted_peers=("127.0.0.1",)) == "127.0.0.1"
@@ -0,0 +1,35 @@
+import asyncio
+from utils import screening
+from utils.document_parser import parse_document
+from utils.screening import ScreeningCandidate, parse_compatibility_score, screen_candidates
+
+
+def make_candidate(document_id: str, similarity: float) -> ScreeningCandidate:
+    document = parse_document(f"CV de {document_id}".encode("utf-8"), f"{document_id}.txt")
+    return ScreeningCandidate(document_id=document_id, document=document, similarity=similarity, cv_excerpt=document.text)
+
+
+def test_failed_candidate_does_not_discard_the_batch(monkeypatch):
+    # Sin modelo de embeddings: el orden por similitud viene dado por los candidatos
+    monkeypatch.setattr(screening, "rank_candidates", lambda candidates, job_info: candidates)
+
+    async def analysis(cv_content: str, job_info: str):
+        if "lenta" in cv_content:
+            raise TimeoutError("El LLM no respondió a tiempo")
+        return f"Compatibilidad: {len(cv_content)}%", {}
+
+    monkeypatch.setattr(screening, "generate_compatibility_analysis", analysis)
+    candidates = [make_candidate("ana", 0.9), make_candidate("lenta", 0.8), make_candidate("luis", 0.7)]
+
+    results = asyncio.run(screen_candidates(candidates, "Oferta de backend", top_k=3))
+
+    by_id = {result["document_id"]: result for result in results}
+    assert by_id["ana"]["analyzed"] and by_id["luis"]["analyzed"]
+    assert not by_id["lenta"]["analyzed"] and "no respondió" in by_id["lenta"]["error"]
+    assert results[-1]["document_id"] == "lenta"
+
+
+def test_parse_compatibility_score_caps_at_100():
+    assert parse_compatibility_score("Porcentaje de compatibilidad: 85%") == 85
+    assert parse_compatibility_score("Compatibilidad 250 %") == 100
+    assert parse_compatibility_score("Sin porcentaje") is None
@@ -0,0 +1,35 @@
+import numpy as np
+from utils.section_retrieval import SECTION_QUERIES, assign_sections
+
+
+def test_short_cv_falls_back_to_full_text():
+    texts = ["Ana Pérez · ana@example.com", "Backend en Acme (2019-2024)"]
+    scores = np.full((len(SECTION_QUERIES), len(texts)), 0.6, dtype=np.float32)
+
+    sections = assign_sections(scores, texts, full_text="CV completo")
+
+    assert sections == {"raw_content": "CV completo"}
+
+
+def test_chunks_go_to_their_best_section_in_cv_order():
+    texts = [f"fragmento {position}" for position in range(len(SECTION_QUERIES))]
+    scores = np.full((len(SECTION_QUERIES), len(texts)), 0.1, dtype=np.float32)
+    np.fill_diagonal(scores, 0.8)
+
+    sections = assign_sections(scores, texts, min_score=0.3)
+
+    assert list(sections.values()) == texts
+
+
+def test_weak_or_empty_section_shares_best_chunks():
+    texts = [f"fragmento {position}" for position in range(6)]
+    scores = np.full((len(SECTION_QUERIES), len(texts)), 0.05, dtype=np.float32)
+    # Todos los fragmentos son de experiencia; "skills" es la segunda más afín para el 4 y el 1
+    scores[1] = 0.9
+    scores[3, 4] = 0.5
+    scores[3, 1] = 0.4
+
+    sections = assign_sections(scores, texts, chunks_per_section=2, min_score=0.3)
+
+    assert all(sections.values())
+    assert sections["skills"] == "fragmento 1\nfragmento 4"
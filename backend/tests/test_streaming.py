@@ -0,0 +1,37 @@
+import asyncio
+from api_server import ANALYSIS_RESPONSE_FIELDS, build_analysis_state, build_thread_config
+from utils.state_graph import app
+from utils.streaming import stream_graph_events
+
+
+def stream_analysis(document_id: str, person_is_postuled_to_job: bool = False, job_info: str = "") -> list:
+    async def collect():
+        state = build_analysis_state({
+            "document_id": document_id,
+            "person_is_postuled_to_job": person_is_postuled_to_job,
+            "job_info": job_info
+        })
+        config = build_thread_config("analysis", state)
+        return [event async for event in stream_graph_events(app, state, config, ANALYSIS_RESPONSE_FIELDS)]
+    return asyncio.run(collect())
+
+
+def test_stream_ends_with_the_projected_output(fake_llm, upload_cv):
+    events = stream_analysis(upload_cv())
+
+    assert [event["node"] for event in events if event["event"] == "node"][0] == "resume"
+    end = events[-1]
+    assert end["event"] == "end"
+    assert set(end["output"]) == set(ANALYSIS_RESPONSE_FIELDS)
+    assert end["output"]["is_cv_valid"] is True and end["output"]["summary"]
+
+
+def test_resumed_stream_reports_the_saved_validation(fake_llm, upload_cv):
+    document_id = upload_cv()
+    first = stream_analysis(document_id)[-1]["output"]
+    # Mismo CV, nueva oferta: el hilo se reanuda sin volver a extraer ni validar el CV
+    second = stream_analysis(document_id, True, "Buscamos ingeniera backend con Python y AWS.")[-1]["output"]
+
+    assert second["is_cv_valid"] is True
+    assert second["cv_content_preview"] == first["cv_content_preview"] and second["cv_content_preview"]
+    assert second["compatibility_analysis"]
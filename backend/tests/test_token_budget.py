@@ -0,0 +1,51 @@
+from utils.token_budget import (
+    TRUNCATION_MARKER, count_tokens, cut_line, dedupe_lines, fit_to_budget, merge_token_usage
+)
+
+FIRST_SENTENCE = "Lideré la migración de los servicios de facturación a contenedores en la nube con cero caídas."
+SECOND_SENTENCE = "Después coordiné al equipo de datos para automatizar los informes mensuales de ventas y stock."
+
+
+def test_fit_to_budget_keeps_text_that_already_fits():
+    assert fit_to_budget("Python y SQL", 50) == "Python y SQL"
+
+
+def test_single_paragraph_keeps_its_beginning():
+    paragraph = " ".join([FIRST_SENTENCE, SECOND_SENTENCE] * 20)
+
+    fitted = fit_to_budget(paragraph, 60)
+
+    assert fitted.endswith(TRUNCATION_MARKER)
+    assert fitted.startswith(FIRST_SENTENCE)
+    assert count_tokens(fitted) <= 60
+
+
+def test_fit_to_budget_drops_whole_lines_after_the_budget():
+    text = "\n".join(f"Línea {number}: {FIRST_SENTENCE}" for number in range(30))
+
+    fitted = fit_to_budget(text, 80).splitlines()
+
+    assert fitted[0] == f"Línea 0: {FIRST_SENTENCE}"
+    assert fitted[-1] == TRUNCATION_MARKER
+    assert len(fitted) < 30
+
+
+def test_cut_line_ends_at_a_nearby_sentence_boundary():
+    line = f"{FIRST_SENTENCE} {SECOND_SENTENCE}"
+    budget = count_tokens(f"{FIRST_SENTENCE} Después coordiné al")
+
+    assert cut_line(line, budget) == FIRST_SENTENCE
+    assert cut_line(line, 0) == ""
+
+
+def test_dedupe_lines_drops_repeated_chunk_overlap():
+    text = f"{FIRST_SENTENCE}\n{FIRST_SENTENCE.upper()}\nPython\nPython"
+
+    assert dedupe_lines(text) == f"{FIRST_SENTENCE}\nPython\nPython"
+
+
+def test_merge_token_usage_resets_on_none():
+    usage = merge_token_usage({"validate": {"cv": 10}}, {"summary": {"cv": 5}})
+
+    assert set(usage) == {"validate", "summary"}
+    assert merge_token_usage(usage, None) == {}
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Sequence
+from utils.config import (
+    ADMISSION_MAX_ACTIVE, ADMISSION_MAX_QUEUED, ADMISSION_QUEUE_TIMEOUT_SECONDS, TRUSTED_CLIENT_ID_PEERS
+)
+
+# Rutas que ejecutan los grafos o el cribado; las subidas y consultas ligeras no pasan por la cola
+ADMISSION_PATHS = (
+    "/joblens/events",
+    "/joblens/invoke",
+    "/joblens/batch",
+    "/joblens/stream",
+    "/joblens/improve-cv",
+    "/joblens/screen",
+)
+
+
+def client_identity(peer: str, claimed_id: str = "", trusted_peers: Sequence[str] = TRUSTED_CLIENT_ID_PEERS) -> str:
+    """Clave del cupo por cliente: la dirección del par, subdividida por la cabecera solo si el par es de confianza"""
+    peer = peer or "unknown"
+    if claimed_id and peer in trusted_peers:
+        return f"{peer}/{claimed_id}"
+    return peer
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Cola acotada de peticiones pesadas: limita las activas y rechaza pronto cuando la espera se llena"""
+
+    def __init__(
+        self,
+        max_active: int = ADMISSION_MAX_ACTIVE,
+        max_queued: int = ADMISSION_MAX_QUEUED,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._active = asyncio.Semaphore(max_active)
+        self._queued = 0
+
+    @staticmethod
+    def applies_to(path: str) -> bool:
+        return path.startswith(ADMISSION_PATHS)
+
+    async def acquire(self):
+        """Ocupa un hueco o lanza Overloaded si la cola está llena o la espera se agota"""
+        if self._active.locked() and self._queued >= self.max_queued:
+            raise Overloaded("queue_full", retry_after=max(1, int(self.queue_timeout)))
+
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._active.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Overloaded("queue_timeout", retry_after=max(1, int(self.queue_timeout)))
+        finally:
+            self._queued -= 1
+
+    def release(self):
+        self._active.release()
@@ -0,0 +1,329 @@
+import os
+import time
+import math
+import sqlite3
+import threading
+from typing import List, Optional, Set
+import faiss
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.cv_heuristics import split_sections
+from utils.document_parser import ParsedDocument
+from utils.embeddings import get_embeddings
+from utils.screening import split_requirements
+from utils.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, CANDIDATE_INDEX_DIR, CANDIDATE_INDEX_IVF_THRESHOLD,
+    CANDIDATE_INDEX_COMPRESSION, CANDIDATE_INDEX_NPROBE, CANDIDATE_INDEX_SAVE_INTERVAL_SECONDS
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+INDEX_FILE_NAME = "candidates.faiss"
+METADATA_FILE_NAME = "candidates.sqlite3"
+LOCK_FILE_NAME = "candidates.lock"
+# Subcuantizadores de PQ; debe dividir la dimensión del modelo (384 en all-MiniLM-L6-v2)
+PQ_SUBQUANTIZERS = 48
+
+
+class CandidateIndex:
+    """Índice vectorial persistente de todos los CV ingeridos, actualizable de forma incremental.
+
+    Cada fragmento se guarda con su documento, sección y fecha de subida en SQLite, y su
+    vector en FAISS bajo el mismo identificador. Por debajo del umbral el índice es exacto
+    (Flat); al superarlo se migra a IVF (o IVF-PQ comprimido) sin volver a embeber nada.
+
+    El índice vive en memoria y se escribe en disco periódicamente, así que solo un proceso puede
+    usar cada directorio: con varios workers de uvicorn, el segundo falla al bloquearlo.
+    """
+
+    def __init__(
+        self,
+        index_dir: str = CANDIDATE_INDEX_DIR,
+        ivf_threshold: int = CANDIDATE_INDEX_IVF_THRESHOLD,
+        compression: str = CANDIDATE_INDEX_COMPRESSION,
+        nprobe: int = CANDIDATE_INDEX_NPROBE,
+        save_interval_seconds: int = CANDIDATE_INDEX_SAVE_INTERVAL_SECONDS
+    ):
+        if compression not in ("none", "pq"):
+            raise ValueError(f"Compresión de índice no soportada: {compression}")
+
+        self.index_dir = index_dir
+        self.ivf_threshold = ivf_threshold
+        self.compression = compression
+        self.nprobe = nprobe
+        self.save_interval_seconds = save_interval_seconds
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._last_save = time.time()
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._lock_file = self._acquire_directory_lock()
+        self._db = sqlite3.connect(os.path.join(index_dir, METADATA_FILE_NAME), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                document_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                section TEXT NOT NULL,
+                uploaded_at REAL NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_document ON chunks (document_id)")
+        self._db.commit()
+
+        index_path = os.path.join(index_dir, INDEX_FILE_NAME)
+        self.index = faiss.read_index(index_path) if os.path.exists(index_path) else None
+        self._configure_search()
+        self._reconcile()
+
+    def _acquire_directory_lock(self):
+        """Bloquea el directorio para este proceso: dos procesos sobrescribirían el mismo archivo FAISS"""
+        lock_file = open(os.path.join(self.index_dir, LOCK_FILE_NAME), "w")
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"El índice de candidatos de {self.index_dir} ya está en uso por otro proceso; "
+                "ejecuta el servidor con un solo worker o usa un JOBLENS_CANDIDATE_INDEX_DIR por proceso."
+            )
+        return lock_file
+
+    def _index_ids(self) -> Set[int]:
+        if self.index is None:
+            return set()
+        if not self.is_ivf:
+            return set(faiss.vector_to_array(self.index.id_map).tolist())
+        invlists = faiss.downcast_index(self.index).invlists
+        ids = set()
+        for list_number in range(invlists.nlist):
+            size = invlists.list_size(list_number)
+            if size:
+                ids.update(faiss.rev_swig_ptr(invlists.get_ids(list_number), size).tolist())
+        return ids
+
+    def _reconcile(self):
+        """Alinea el índice FAISS guardado con los metadatos de SQLite tras un cierre sin guardar.
+
+        Los metadatos se confirman al momento y el índice solo cada `save_interval_seconds`, así que
+        tras una caída puede haber fragmentos sin vector (sus CV se eliminan para poder reindexarlos)
+        o vectores de fragmentos ya borrados (se quitan del índice).
+        """
+        with self._lock:
+            index_ids = self._index_ids()
+            rows = self._db.execute("SELECT id, document_id FROM chunks").fetchall()
+            chunk_ids = {chunk_id for chunk_id, _ in rows}
+
+            missing_documents = {document_id for chunk_id, document_id in rows if chunk_id not in index_ids}
+            for document_id in missing_documents:
+                self._delete_locked(document_id)
+            orphan_ids = index_ids - chunk_ids
+            if orphan_ids:
+                self.index.remove_ids(np.array(sorted(orphan_ids), dtype=np.int64))
+
+            if missing_documents or orphan_ids:
+                print(
+                    f"Índice de candidatos reconciliado: {len(missing_documents)} CV sin vectores eliminados, "
+                    f"{len(orphan_ids)} vectores huérfanos quitados."
+                )
+                self._dirty = True
+                self.save()
+
+    @property
+    def is_ivf(self) -> bool:
+        return self.index is not None and isinstance(faiss.downcast_index(self.index), faiss.IndexIVF)
+
+    def _configure_search(self):
+        if self.is_ivf:
+            faiss.downcast_index(self.index).nprobe = self.nprobe
+
+    def _chunk_document(self, document: ParsedDocument):
+        return [
+            (section, chunk)
+            for section, section_text in split_sections(document.text)
+            for chunk in self.text_splitter.split_text(section_text)
+        ]
+
+    def contains(self, document_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM chunks WHERE document_id = ? LIMIT 1", (document_id,)).fetchone()
+            return row is not None
+
+    def add(self, document_id: str, document: ParsedDocument, uploaded_at: Optional[float] = None):
+        """Añade un CV nuevo; falla si el documento ya está indexado"""
+        if self.contains(document_id):
+            raise ValueError(f"El documento ya está indexado: {document_id}")
+        self.upsert(document_id, document, uploaded_at)
+
+    def upsert(self, document_id: str, document: ParsedDocument, uploaded_at: Optional[float] = None) -> int:
+        """Indexa el CV reemplazando sus fragmentos anteriores, si los había; devuelve cuántos añade"""
+        chunks = self._chunk_document(document)
+        if not chunks:
+            self.delete(document_id)
+            return 0
+
+        vectors = np.array(get_embeddings().embed_documents([text for _, text in chunks]), dtype=np.float32)
+        uploaded_at = uploaded_at or time.time()
+
+        with self._lock:
+            self._delete_locked(document_id)
+            ids = []
+            for section, text in chunks:
+                cursor = self._db.execute(
+                    "INSERT INTO chunks (document_id, filename, section, uploaded_at, text) VALUES (?, ?, ?, ?, ?)",
+                    (document_id, document.filename, section, uploaded_at, text)
+                )
+                ids.append(cursor.lastrowid)
+            self._db.commit()
+
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+            self.index.add_with_ids(vectors, np.array(ids, dtype=np.int64))
+            self._maybe_upgrade()
+            self._mark_dirty()
+        return len(chunks)
+
+    def delete(self, document_id: str) -> int:
+        """Elimina todos los fragmentos de un CV; devuelve cuántos se eliminaron"""
+        with self._lock:
+            removed = self._delete_locked(document_id)
+            if removed:
+                self._mark_dirty()
+            return removed
+
+    def _delete_locked(self, document_id: str) -> int:
+        ids = [row[0] for row in self._db.execute("SELECT id FROM chunks WHERE document_id = ?", (document_id,))]
+        if not ids:
+            return 0
+        if self.index is not None:
+            self.index.remove_ids(np.array(ids, dtype=np.int64))
+        self._db.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+        self._db.commit()
+        return len(ids)
+
+    def _maybe_upgrade(self):
+        """Migra el índice exacto a IVF cuando supera el umbral, reutilizando los vectores ya guardados"""
+        if self.is_ivf or self.index.ntotal < self.ivf_threshold:
+            return
+
+        ids = faiss.vector_to_array(self.index.id_map).astype(np.int64)
+        vectors = np.vstack([self.index.reconstruct(int(vector_id)) for vector_id in ids]).astype(np.float32)
+        dimension = vectors.shape[1]
+        nlist = max(1, int(4 * math.sqrt(len(ids))))
+
+        quantizer = faiss.IndexFlatIP(dimension)
+        if self.compression == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_SUBQUANTIZERS, 8, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.add_with_ids(vectors, ids)
+
+        print(f"Índice de candidatos migrado a IVF ({nlist} listas, {len(ids)} vectores).")
+        self.index = index
+        self._configure_search()
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if time.time() - self._last_save >= self.save_interval_seconds:
+            self.save()
+
+    def save(self):
+        """Escribe el índice FAISS en disco de forma atómica si hay cambios pendientes"""
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+            index_path = os.path.join(self.index_dir, INDEX_FILE_NAME)
+            tmp_path = f"{index_path}.tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, index_path)
+            self._dirty = False
+            self._last_save = time.time()
+
+    def search(self, job_info: str, k: int = 10) -> List[dict]:
+        """Devuelve los k CV que mejor cubren los requisitos de la oferta, sin re-embeber ningún CV"""
+        requirements = split_requirements(job_info)
+        query_vectors = np.array(get_embeddings().embed_documents(requirements), dtype=np.float32)
+
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0:
+                return []
+            # Se piden más fragmentos que CV porque cada CV aporta varios fragmentos
+            hits = min(self.index.ntotal, k * 10)
+            scores, ids = self.index.search(query_vectors, hits)
+
+            chunk_scores = {}
+            for requirement_index, (row_scores, row_ids) in enumerate(zip(scores, ids)):
+                for score, chunk_id in zip(row_scores, row_ids):
+                    if chunk_id >= 0:
+                        chunk_scores[(requirement_index, int(chunk_id))] = float(score)
+
+            chunk_ids = sorted({chunk_id for _, chunk_id in chunk_scores})
+            placeholders = ",".join("?" * len(chunk_ids))
+            rows = self._db.execute(
+                f"SELECT id, document_id, filename, section, uploaded_at FROM chunks WHERE id IN ({placeholders})",
+                chunk_ids
+            ).fetchall() if chunk_ids else []
+
+        chunks = {row[0]: row[1:] for row in rows}
+        documents = {}
+        for (requirement_index, chunk_id), score in chunk_scores.items():
+            if chunk_id not in chunks:
+                continue
+            document_id, filename, section, uploaded_at = chunks[chunk_id]
+            entry = documents.setdefault(document_id, {
+                "document_id": document_id,
+                "filename": filename,
+                "uploaded_at": uploaded_at,
+                "requirement_scores": [0.0] * len(requirements),
+                "matched_sections": set()
+            })
+            if score > entry["requirement_scores"][requirement_index]:
+                entry["requirement_scores"][requirement_index] = score
+            entry["matched_sections"].add(section)
+
+        results = []
+        for entry in documents.values():
+            requirement_scores = entry.pop("requirement_scores")
+            entry["score"] = round(sum(requirement_scores) / len(requirement_scores), 4)
+            entry["matched_sections"] = sorted(entry["matched_sections"])
+            results.append(entry)
+        results.sort(key=lambda entry: entry["score"], reverse=True)
+        return results[:k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents = self._db.execute("SELECT COUNT(DISTINCT document_id) FROM chunks").fetchone()[0]
+            return {
+                "documents": documents,
+                "vectors": self.index.ntotal if self.index is not None else 0,
+                "index_type": "ivf" if self.is_ivf else "flat",
+                "compression": self.compression if self.is_ivf else "none"
+            }
+
+
+_candidate_index = None
+_candidate_index_lock = threading.Lock()
+
+
+def get_candidate_index() -> CandidateIndex:
+    """Devuelve el índice de candidatos compartido por todo el proceso"""
+    global _candidate_index
+    with _candidate_index_lock:
+        if _candidate_index is None:
+            _candidate_index = CandidateIndex()
+        return _candidate_index
+
+
+def save_candidate_index():
+    """Guarda el índice de candidatos si este proceso llegó a crearlo"""
+    with _candidate_index_lock:
+        if _candidate_index is not None:
+            _candidate_index.save()
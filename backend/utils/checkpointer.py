@@ -0,0 +1,184 @@
+import time
+import zlib
+import pickle
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from utils.executor import run_blocking
+from utils.config import (
+    CHECKPOINT_BACKEND, CHECKPOINT_DB_PATH, CHECKPOINT_MAX_PER_THREAD,
+    CHECKPOINT_TTL_SECONDS, CHECKPOINT_COMPACTION_INTERVAL_SECONDS
+)
+
+
+def serialize_checkpoint(value: Any) -> bytes:
+    """Serializa el checkpoint con pickle y lo comprime; el historial de mensajes es muy repetitivo"""
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def deserialize_checkpoint(data: bytes) -> Any:
+    return pickle.loads(zlib.decompress(data))
+
+
+def _thread_config(thread_id: str, checkpoint_id: str) -> RunnableConfig:
+    return {"configurable": {"thread_id": thread_id, "thread_ts": checkpoint_id}}
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """Checkpointer persistente en SQLite, acotado por hilo y con compactación por antigüedad.
+
+    Solo se conservan los últimos `max_per_thread` checkpoints de cada hilo y se eliminan los
+    que superan el TTL, así que la memoria del proceso no crece con el número de peticiones.
+    En modo WAL la misma base de datos puede compartirse entre varios workers de uvicorn.
+    """
+
+    def __init__(
+        self,
+        db_path: str = CHECKPOINT_DB_PATH,
+        max_per_thread: int = CHECKPOINT_MAX_PER_THREAD,
+        ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+        compaction_interval_seconds: int = CHECKPOINT_COMPACTION_INTERVAL_SECONDS,
+        conn: Optional[sqlite3.Connection] = None
+    ):
+        super().__init__()
+        self.db_path = db_path
+        self.max_per_thread = max_per_thread
+        self.ttl_seconds = ttl_seconds
+        self.compaction_interval_seconds = compaction_interval_seconds
+        self.conn = conn or sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._last_compaction = 0.0
+
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_id TEXT,
+                created_at REAL NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_id)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_created_at ON checkpoints (created_at)")
+        self.conn.commit()
+
+    def _to_tuple(self, thread_id: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_id, checkpoint, metadata = row
+        return CheckpointTuple(
+            config=_thread_config(thread_id, checkpoint_id),
+            checkpoint=deserialize_checkpoint(checkpoint),
+            metadata=deserialize_checkpoint(metadata),
+            parent_config=_thread_config(thread_id, parent_id) if parent_id else None
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Devuelve el checkpoint pedido o el último del hilo, salvo que haya expirado"""
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_id = config["configurable"].get("thread_ts")
+        query = (
+            "SELECT checkpoint_id, parent_id, checkpoint, metadata FROM checkpoints "
+            "WHERE thread_id = ? AND created_at >= ?"
+        )
+        params = [thread_id, time.time() - self.ttl_seconds]
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        with self._lock:
+            row = self.conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", params).fetchone()
+        return self._to_tuple(thread_id, row) if row is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        """Recorre los checkpoints no expirados, del más reciente al más antiguo"""
+        query = "SELECT thread_id, checkpoint_id, parent_id, checkpoint, metadata FROM checkpoints WHERE created_at >= ?"
+        params = [time.time() - self.ttl_seconds]
+        if config is not None:
+            query += " AND thread_id = ?"
+            params.append(str(config["configurable"]["thread_id"]))
+        if before is not None:
+            query += " AND checkpoint_id < ?"
+            params.append(before["configurable"]["thread_ts"])
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall()
+
+        for thread_id, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            saved = self._to_tuple(thread_id, row)
+            if filter and any(saved.metadata.get(key) != value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield saved
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        """Guarda el checkpoint y recorta el historial del hilo al límite de retención"""
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_id = checkpoint["id"]
+        parent_id = config["configurable"].get("thread_ts")
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(thread_id, checkpoint_id, parent_id, created_at, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_id, parent_id, now,
+                 serialize_checkpoint(checkpoint), serialize_checkpoint(metadata))
+            )
+            self.conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN ("
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? ORDER BY checkpoint_id DESC LIMIT ?)",
+                (thread_id, thread_id, self.max_per_thread)
+            )
+            if now - self._last_compaction >= self.compaction_interval_seconds:
+                self.conn.execute("DELETE FROM checkpoints WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._last_compaction = now
+            self.conn.commit()
+        return _thread_config(thread_id, checkpoint_id)
+
+    # Las variantes asíncronas usan el pool bloqueante para no detener el event loop con SQLite
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        saved = await run_blocking(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in saved:
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata) -> RunnableConfig:
+        return await run_blocking(self.put, config, checkpoint, metadata)
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """Devuelve el checkpointer compartido por los grafos según `CHECKPOINT_BACKEND`"""
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            if CHECKPOINT_BACKEND == "sqlite":
+                _checkpointer = SQLiteCheckpointSaver()
+            elif CHECKPOINT_BACKEND == "memory":
+                _checkpointer = MemorySaver()
+            else:
+                raise ValueError(f"Backend de checkpoints no soportado: {CHECKPOINT_BACKEND}")
+        return _checkpointer
@@ -1,14 +1,225 @@
-from langchain_core.messages import HumanMessage
+import os
+import warnings
+from langchain_core.messages import HumanMessage, RemoveMessage
+
+# RemoveMessage está en beta en la versión fijada de langchain-core; su aviso se repetiría en cada proceso
+warnings.filterwarnings("ignore", message="The class `RemoveMessage` is in beta")
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
 
 THREAD_CONFIG = {"configurable": {"thread_id": 1}}
 
+
+def make_thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+# Solo incluye los datos de la petición y los resultados que se recalculan en cada análisis;
+# el contenido y la validación del CV se conservan del checkpoint del documento, si lo hay
+# Id de RemoveMessage que vacía el historial; con él cada ejecución de un hilo empieza sus propios mensajes
+REMOVE_ALL_MESSAGES = "__remove_all__"
+
 INITIAL_STATE = {
-    "messages": [HumanMessage(content="Analizar CV")],
-    "cv_content": "",
-    "is_cv_valid": False,
+    "messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), HumanMessage(content="Analizar CV")],
     "feedback": "",
     "summary": "",
+    "compatibility_analysis": "",
     "person_is_postuled_to_job": False,
     "job_info": "",
-    "cv_file_path": ""
+    "cv_file_path": "",
+    "document_id": "",
+    # None reinicia el informe de tokens en lugar de mezclarse con el de la ejecución anterior
+    "token_usage": None
+}
+
+LLM_MODEL_NAME = os.getenv("JOBLENS_LLM_MODEL", "llama-3.1-8b-instant")
+
+# Enrutado de modelos por nodo: "fast" para validaciones y decisiones cortas, "quality" para la
+# generación larga. Con el enrutado desactivado todos los nodos usan LLM_MODEL_NAME
+LLM_ROUTING = _env_flag("JOBLENS_LLM_ROUTING", "true")
+LLM_MODEL_TIERS = {
+    "fast": os.getenv("JOBLENS_LLM_FAST_MODEL", LLM_MODEL_NAME),
+    "quality": os.getenv("JOBLENS_LLM_QUALITY_MODEL", "llama-3.3-70b-versatile"),
+}
+LLM_NODE_TIERS = {
+    "validate_structure": "fast",
+    "provide_feedback": "fast",
+    "create_summary": "fast",
+    "format_cv": "fast",
+    "analyze_compatibility": "quality",
+    "improve_structure": "quality",
+    "improve_sections": "quality",
 }
+# Permite reasignar nodos sin tocar el código, p. ej. "create_summary=quality,format_cv=quality"
+LLM_NODE_TIERS.update(
+    pair.strip().split("=", 1) for pair in os.getenv("JOBLENS_LLM_NODE_TIERS", "").split(",") if "=" in pair
+)
+# Si el modelo principal falla o tarda más que su timeout, la llamada se repite con el modelo alternativo
+LLM_FALLBACK_TIERS = {"fast": "quality", "quality": "fast"}
+LLM_FALLBACK_ENABLED = _env_flag("JOBLENS_LLM_FALLBACK", "true")
+# Segundos hasta la respuesta (o hasta el primer token en streaming); 0 desactiva el timeout
+LLM_TIER_TIMEOUT_SECONDS = {
+    "fast": float(os.getenv("JOBLENS_LLM_FAST_TIMEOUT_SECONDS", "15")),
+    "quality": float(os.getenv("JOBLENS_LLM_QUALITY_TIMEOUT_SECONDS", "45")),
+}
+
+# "sequential" ejecuta los nodos uno tras otro; "parallel" valida el CV a la vez que genera
+# el resumen o el análisis de compatibilidad y descarta ese resultado si el CV no es válido
+WORKFLOW_MODE = os.getenv("JOBLENS_WORKFLOW_MODE", "sequential")
+
+# CV subidos al endpoint de ingesta; viven en SQLite para que todos los workers de uvicorn los vean
+DOCUMENT_STORE_PATH = os.getenv("JOBLENS_DOCUMENT_STORE_PATH", "documents.sqlite3")
+DOCUMENT_TTL_SECONDS = int(os.getenv("JOBLENS_DOCUMENT_TTL_SECONDS", "3600"))
+DOCUMENT_STORE_MAX_BYTES = int(os.getenv("JOBLENS_DOCUMENT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("JOBLENS_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Parseo de documentos: los PDF con muchas páginas se extraen en paralelo en varios procesos
+PDF_PARSE_WORKERS = int(os.getenv("JOBLENS_PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("JOBLENS_PDF_PARALLEL_MIN_PAGES", "4"))
+PARSED_DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("JOBLENS_PARSED_DOCUMENT_CACHE_MAX_ENTRIES", "512"))
+
+# Extracción del contenido del CV: "full" usa el texto completo, "retrieval" lo fragmenta,
+# embebe y recupera, y "auto" usa el texto completo si cabe en el presupuesto de tokens
+EXTRACTION_STRATEGY = os.getenv("JOBLENS_EXTRACTION_STRATEGY", "auto")
+FULL_TEXT_TOKEN_BUDGET = int(os.getenv("JOBLENS_FULL_TEXT_TOKEN_BUDGET", "4000"))
+
+# Embeddings y particionado del CV
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Tokenizador local con el que se miden los prompts; por defecto, el del modelo de embeddings
+TOKENIZER_NAME = os.getenv("JOBLENS_TOKENIZER", EMBEDDING_MODEL_NAME)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Afinidad mínima (coseno) del mejor fragmento propio de una sección; por debajo, la sección
+# comparte los fragmentos más afines de todo el CV
+SECTION_MIN_SCORE = float(os.getenv("JOBLENS_SECTION_MIN_SCORE", "0.25"))
+# "auto" usa CUDA si está disponible y, si no, CPU
+EMBEDDING_DEVICE = os.getenv("JOBLENS_EMBEDDING_DEVICE", "auto")
+EMBEDDING_WARMUP = _env_flag("JOBLENS_EMBEDDING_WARMUP", "false")
+
+# Agrupación de embeddings entre peticiones concurrentes
+EMBEDDING_BATCHING = _env_flag("JOBLENS_EMBEDDING_BATCHING", "true")
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("JOBLENS_EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("JOBLENS_EMBEDDING_BATCH_MAX_WAIT_MS", "10"))
+
+# Almacenamiento de índices FAISS: "cache" (persistente por documento) o "memory" (sin tocar disco)
+INDEX_STORAGE = os.getenv("JOBLENS_INDEX_STORAGE", "cache")
+
+# Hilos dedicados a trabajo bloqueante (embeddings, FAISS, parseo) fuera del event loop
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("JOBLENS_BLOCKING_WORKERS", "4"))
+
+# Caché de índices FAISS direccionada por contenido
+INDEX_CACHE_DIR = os.getenv("JOBLENS_INDEX_CACHE_DIR", "cv_index_cache")
+INDEX_CACHE_MAX_ENTRIES = int(os.getenv("JOBLENS_INDEX_CACHE_MAX_ENTRIES", "256"))
+INDEX_CACHE_MAX_BYTES = int(os.getenv("JOBLENS_INDEX_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+INDEX_CACHE_MAX_AGE_SECONDS = int(os.getenv("JOBLENS_INDEX_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# Caché de respuestas del LLM
+LLM_CACHE_ENABLED = _env_flag("JOBLENS_LLM_CACHE", "true")
+LLM_CACHE_PATH = os.getenv("JOBLENS_LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("JOBLENS_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("JOBLENS_LLM_CACHE_MAX_ENTRIES", "10000"))
+# Nivel semántico opcional: reutiliza respuestas de entradas casi idénticas. Solo se aplica a nodos
+# cuya respuesta no depende de los detalles del CV o la oferta: el embedding de un CV largo domina
+# el de una oferta distinta y devolvería el análisis o el resumen de otro documento
+LLM_CACHE_SEMANTIC = _env_flag("JOBLENS_LLM_CACHE_SEMANTIC", "false")
+LLM_CACHE_SEMANTIC_NODES = tuple(
+    node.strip()
+    for node in os.getenv("JOBLENS_LLM_CACHE_SEMANTIC_NODES", "validate_structure").split(",")
+    if node.strip()
+)
+LLM_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("JOBLENS_LLM_CACHE_SIMILARITY_THRESHOLD", "0.97"))
+
+# Versión de cada plantilla de prompt; incrementarla invalida sus respuestas en caché
+PROMPT_VERSIONS = {
+    "validate_structure": 2,
+    "provide_feedback": 1,
+    "create_summary": 1,
+    "analyze_compatibility": 1,
+    "improve_section": 1,
+}
+
+# Cribado de varios CV contra una misma oferta
+SCREENING_TOP_K = int(os.getenv("JOBLENS_SCREENING_TOP_K", "10"))
+SCREENING_LLM_CONCURRENCY = int(os.getenv("JOBLENS_SCREENING_LLM_CONCURRENCY", "4"))
+SCREENING_MAX_CANDIDATES = int(os.getenv("JOBLENS_SCREENING_MAX_CANDIDATES", "500"))
+
+# Índice persistente de candidatos (todos los CV ingeridos)
+CANDIDATE_INDEX_DIR = os.getenv("JOBLENS_CANDIDATE_INDEX_DIR", "candidate_index")
+# A partir de este número de vectores el índice exacto se migra a IVF
+CANDIDATE_INDEX_IVF_THRESHOLD = int(os.getenv("JOBLENS_CANDIDATE_INDEX_IVF_THRESHOLD", "50000"))
+# "none" usa IVF-Flat; "pq" comprime los vectores con IVF-PQ
+CANDIDATE_INDEX_COMPRESSION = os.getenv("JOBLENS_CANDIDATE_INDEX_COMPRESSION", "none")
+CANDIDATE_INDEX_NPROBE = int(os.getenv("JOBLENS_CANDIDATE_INDEX_NPROBE", "16"))
+CANDIDATE_INDEX_SAVE_INTERVAL_SECONDS = int(os.getenv("JOBLENS_CANDIDATE_INDEX_SAVE_INTERVAL_SECONDS", "30"))
+
+# Presupuesto de tokens por nodo y entrada; las entradas más largas se comprimen y recortan.
+# El del CV se deriva del umbral de texto completo, así que un CV que la extracción pasa entero
+# llega entero a todos los nodos
+CV_TOKEN_BUDGET = FULL_TEXT_TOKEN_BUDGET
+NODE_TOKEN_BUDGETS = {
+    "validate_structure": {"cv_content": CV_TOKEN_BUDGET},
+    "provide_feedback": {"cv_content": CV_TOKEN_BUDGET},
+    "create_summary": {"cv_content": CV_TOKEN_BUDGET},
+    "analyze_compatibility": {"cv_content": CV_TOKEN_BUDGET, "job_info": 1200},
+    "improve_structure": {"cv_sections": CV_TOKEN_BUDGET, "feedback": 1200},
+    "improve_sections": {"cv_sections": CV_TOKEN_BUDGET, "feedback": 1200},
+    # El CV mejorado suele ser algo más largo que el original
+    "format_cv": {"improved_cv": CV_TOKEN_BUDGET + 500},
+}
+
+# "structured" mejora el CV con una sola llamada que devuelve JSON por sección y lo formatea
+# localmente; "two_pass" conserva la mejora en texto libre seguida de un segundo formateo con el LLM
+IMPROVE_CV_MODE = os.getenv("JOBLENS_IMPROVE_CV_MODE", "structured")
+# En modo estructurado, regenera solo las secciones que menciona el feedback
+IMPROVE_CV_TARGETED = _env_flag("JOBLENS_IMPROVE_CV_TARGETED", "false")
+
+# Checkpoints de los grafos: "sqlite" los guarda en disco y los comparte entre workers; "memory" usa MemorySaver
+CHECKPOINT_BACKEND = os.getenv("JOBLENS_CHECKPOINT_BACKEND", "sqlite")
+CHECKPOINT_DB_PATH = os.getenv("JOBLENS_CHECKPOINT_DB_PATH", "checkpoints.sqlite3")
+CHECKPOINT_MAX_PER_THREAD = int(os.getenv("JOBLENS_CHECKPOINT_MAX_PER_THREAD", "2"))
+CHECKPOINT_TTL_SECONDS = int(os.getenv("JOBLENS_CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+# La compactación por TTL se ejecuta como mucho una vez por intervalo, no en cada escritura
+CHECKPOINT_COMPACTION_INTERVAL_SECONDS = int(os.getenv("JOBLENS_CHECKPOINT_COMPACTION_INTERVAL_SECONDS", "300"))
+
+# Estado compacto de los grafos: historial de mensajes acotado y textos grandes guardados por referencia
+STATE_MAX_MESSAGES = int(os.getenv("JOBLENS_STATE_MAX_MESSAGES", "10"))
+MESSAGE_PREVIEW_CHARS = int(os.getenv("JOBLENS_MESSAGE_PREVIEW_CHARS", "200"))
+CV_CONTENT_PREVIEW_CHARS = int(os.getenv("JOBLENS_CV_CONTENT_PREVIEW_CHARS", "1000"))
+TEXT_STORE_PATH = os.getenv("JOBLENS_TEXT_STORE_PATH", "texts.sqlite3")
+TEXT_STORE_TTL_SECONDS = int(os.getenv("JOBLENS_TEXT_STORE_TTL_SECONDS", str(CHECKPOINT_TTL_SECONDS)))
+TEXT_STORE_MAX_ENTRIES = int(os.getenv("JOBLENS_TEXT_STORE_MAX_ENTRIES", "5000"))
+
+# Pool de llamadas al LLM: concurrencia global y por cliente, cuotas del proveedor y reintentos
+LLM_MAX_CONCURRENCY = int(os.getenv("JOBLENS_LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONCURRENCY_PER_CLIENT = int(os.getenv("JOBLENS_LLM_MAX_CONCURRENCY_PER_CLIENT", "4"))
+# Cuotas por minuto del proveedor; 0 desactiva el límite correspondiente
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("JOBLENS_LLM_REQUESTS_PER_MINUTE", "30"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("JOBLENS_LLM_TOKENS_PER_MINUTE", "0"))
+# Tokens de respuesta que se reservan en la cuota antes de conocer la longitud real
+LLM_ESTIMATED_COMPLETION_TOKENS = int(os.getenv("JOBLENS_LLM_ESTIMATED_COMPLETION_TOKENS", "400"))
+LLM_RETRY_ATTEMPTS = int(os.getenv("JOBLENS_LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("JOBLENS_LLM_RETRY_BASE_SECONDS", "1.0"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("JOBLENS_LLM_RETRY_MAX_SECONDS", "20"))
+
+# Control de admisión de la API: peticiones pesadas en curso y en espera antes de responder 429
+ADMISSION_MAX_ACTIVE = int(os.getenv("JOBLENS_ADMISSION_MAX_ACTIVE", "16"))
+ADMISSION_MAX_QUEUED = int(os.getenv("JOBLENS_ADMISSION_MAX_QUEUED", "32"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("JOBLENS_ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+CLIENT_ID_HEADER = os.getenv("JOBLENS_CLIENT_ID_HEADER", "X-Client-ID")
+# Solo estos pares (por defecto el frontend local) pueden identificar a sus usuarios con la cabecera;
+# el resto de clientes se identifica por su dirección, así que cambiar la cabecera no da otro cupo
+TRUSTED_CLIENT_ID_PEERS = tuple(
+    peer.strip() for peer in os.getenv("JOBLENS_TRUSTED_CLIENT_ID_PEERS", "127.0.0.1,::1").split(",") if peer.strip()
+)
+
+# Cola de trabajos en segundo plano para análisis y mejoras de CV largos
+JOB_WORKERS = int(os.getenv("JOBLENS_JOB_WORKERS", "4"))
+JOB_MAX_QUEUED = int(os.getenv("JOBLENS_JOB_MAX_QUEUED", "100"))
+# Los resultados terminados se conservan este tiempo o hasta superar el máximo de trabajos guardados
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOBLENS_JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_MAX_RETAINED = int(os.getenv("JOBLENS_JOB_MAX_RETAINED", "1000"))
+# Espera máxima de una consulta long-poll antes de devolver el estado actual
+JOB_MAX_WAIT_SECONDS = float(os.getenv("JOBLENS_JOB_MAX_WAIT_SECONDS", "30"))
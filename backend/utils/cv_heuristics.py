@@ -0,0 +1,151 @@
+import re
+import unicodedata
+from typing import List, NamedTuple, Optional, Tuple
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Candidatos a teléfono dentro de una línea; looks_like_phone descarta los rangos de años
+PHONE_CANDIDATE_RE = re.compile(r"\+?\(?\d[\d \t().-]{6,}\d")
+YEAR_RE = re.compile(r"(?:19|20)\d{2}")
+MIN_PHONE_DIGITS = 9
+MIN_INTERNATIONAL_PHONE_DIGITS = 8
+MONTH = (
+    r"(?:ene|feb|mar|abr|may|jun|jul|ago|sep|set|oct|nov|dic|"
+    r"jan|apr|aug|dec)[a-z]*\.?"
+)
+DATE = rf"(?:(?:{MONTH}\s+|\d{{1,2}}[/.-])?(?:19|20)\d{{2}})"
+DATE_RANGE_RE = re.compile(
+    rf"{DATE}\s*(?:-|–|—|a|al|hasta|to)\s*(?:{DATE}|actualidad|presente|actual|present|current|now)",
+    re.IGNORECASE
+)
+
+# Palabras con las que el feedback se refiere a cada sección
+SECTION_KEYWORDS = {
+    "personal_info": ("perfil", "sobre mí", "contacto", "datos personales", "profile", "contact", "about me"),
+    "experience": ("experiencia", "trayectoria", "historial laboral", "experience", "employment", "work history"),
+    "education": ("educación", "formación", "estudios", "education", "academic"),
+    "skills": ("habilidades", "competencias", "conocimientos", "aptitudes", "skills", "technologies", "tecnologías"),
+    "achievements": ("logros", "certificaciones", "certificados", "premios", "achievements", "certifications", "awards"),
+}
+# Encabezados completos de cada sección, sin tildes; la línea entera debe coincidir con uno de ellos
+SECTION_HEADINGS = {
+    "personal_info": (
+        "perfil", "perfil profesional", "sobre mi", "contacto", "datos de contacto", "datos personales",
+        "informacion personal", "profile", "professional profile", "contact", "contact information",
+        "personal information", "personal details", "about me",
+    ),
+    "experience": (
+        "experiencia", "experiencia laboral", "experiencia profesional", "trayectoria", "trayectoria profesional",
+        "historial laboral", "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history",
+    ),
+    "education": (
+        "educacion", "formacion", "formacion academica", "estudios", "education", "academic background",
+        "academic training",
+    ),
+    "skills": (
+        "habilidades", "habilidades tecnicas", "competencias", "conocimientos", "aptitudes", "tecnologias",
+        "skills", "technical skills", "technologies",
+    ),
+    "achievements": (
+        "logros", "certificaciones", "certificados", "premios", "achievements", "certifications", "awards",
+    ),
+}
+# Encabezados compuestos como "Educación y certificaciones" se asignan a su primera parte reconocida
+HEADING_SEPARATORS_RE = re.compile(r"\s+(?:y|e|and|&)\s+|\s*[/,|]\s*")
+
+CORE_SECTIONS = {"experience", "education", "skills"}
+
+# Un encabezado es una línea corta; las líneas largas que mencionan la palabra son contenido
+MAX_HEADING_WORDS = 5
+MIN_CV_WORDS = 60
+
+
+class CVSignals(NamedTuple):
+    has_email: bool
+    has_phone: bool
+    date_ranges: int
+    sections: frozenset
+    word_count: int
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFD", text) if unicodedata.category(char) != "Mn")
+
+
+def heading_section(line: str) -> Optional[str]:
+    """Devuelve la sección a la que corresponde la línea si es un encabezado reconocido"""
+    cleaned = _strip_accents(line.strip().strip(":#*•-_=").strip().lower())
+    if not cleaned or len(cleaned.split()) > MAX_HEADING_WORDS:
+        return None
+    for part in HEADING_SEPARATORS_RE.split(cleaned):
+        for section, headings in SECTION_HEADINGS.items():
+            if part in headings:
+                return section
+    return None
+
+
+def looks_like_phone(candidate: str) -> bool:
+    """Un teléfono lleva prefijo internacional o al menos 9 dígitos y no está formado por años"""
+    groups = re.findall(r"\d+", candidate)
+    digits = sum(len(group) for group in groups)
+    if candidate.startswith("+"):
+        return digits >= MIN_INTERNATIONAL_PHONE_DIGITS
+    return digits >= MIN_PHONE_DIGITS and not any(YEAR_RE.fullmatch(group) for group in groups)
+
+
+def extract_signals(text: str) -> CVSignals:
+    """Extrae señales locales de estructura de CV: contacto, rangos de fechas y encabezados"""
+    sections = {heading_section(line) for line in text.splitlines()}
+    sections.discard(None)
+    return CVSignals(
+        has_email=bool(EMAIL_RE.search(text)),
+        has_phone=any(looks_like_phone(match.group(0)) for match in PHONE_CANDIDATE_RE.finditer(text)),
+        date_ranges=len(DATE_RANGE_RE.findall(text)),
+        sections=frozenset(sections),
+        word_count=len(text.split())
+    )
+
+
+def classify_cv(text: str) -> Optional[bool]:
+    """Decide localmente los casos evidentes; devuelve None si el documento es ambiguo"""
+    signals = extract_signals(text)
+    has_contact = signals.has_email or signals.has_phone
+    core_sections = CORE_SECTIONS & signals.sections
+
+    if signals.word_count < MIN_CV_WORDS:
+        return False
+    if not has_contact and not core_sections and signals.date_ranges == 0:
+        return False
+    if has_contact and core_sections == CORE_SECTIONS and signals.date_ranges > 0:
+        return True
+    return None
+
+
+def lean_cv_validity(text: str) -> bool:
+    """Estimación local para documentos ambiguos cuando el LLM no devuelve una respuesta utilizable"""
+    signals = extract_signals(text)
+    score = (
+        int(signals.has_email or signals.has_phone)
+        + len(CORE_SECTIONS & signals.sections)
+        + int(signals.date_ranges > 0)
+    )
+    return score >= 3
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """Divide el CV en secciones según sus encabezados; lo previo al primero es información personal"""
+    sections = []
+    current_section, lines = "personal_info", []
+
+    for line in text.splitlines():
+        section = heading_section(line)
+        if section is not None:
+            if any(previous.strip() for previous in lines):
+                sections.append((current_section, "\n".join(lines).strip()))
+            current_section, lines = section, [line]
+        else:
+            lines.append(line)
+
+    if any(previous.strip() for previous in lines):
+        sections.append((current_section, "\n".join(lines).strip()))
+    return sections
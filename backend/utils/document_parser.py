@@ -0,0 +1,154 @@
+import io
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Tuple
+import docx2txt
+from pypdf import PdfReader
+from langchain_core.documents import Document
+from utils.pdf_worker import extract_pdf_pages, pdf_worker_context
+from utils.config import PDF_PARSE_WORKERS, PDF_PARALLEL_MIN_PAGES, PARSED_DOCUMENT_CACHE_MAX_ENTRIES
+from utils.metrics import PARSE_DURATION, PARSE_BYTES, CACHE_LOOKUPS, timed
+
+SUPPORTED_EXTENSIONS = (".txt", ".pdf", ".docx")
+
+
+@dataclass(frozen=True)
+class ParsedPage:
+    number: int
+    text: str
+
+
+@dataclass(frozen=True)
+class ParsedDocument:
+    """Texto normalizado de un CV junto con sus páginas, compartido por todos los nodos"""
+    content_hash: str
+    filename: str
+    pages: Tuple[ParsedPage, ...]
+    size: int
+
+    @property
+    def text(self) -> str:
+        return "\n".join(page.text for page in self.pages)
+
+    def to_documents(self) -> List[Document]:
+        """Convierte las páginas en documentos de LangChain para fragmentarlos y embeberlos"""
+        return [
+            Document(page_content=page.text, metadata={"source": self.filename, "page": page.number})
+            for page in self.pages
+        ]
+
+
+def get_extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def normalize_text(text: str) -> str:
+    """Limpia espacios sobrantes y saltos de línea repetidos de la extracción"""
+    text = (text or "").replace("\x00", "").replace("\u00a0", " ")
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_PARSE_WORKERS, mp_context=pdf_worker_context())
+        return _pdf_pool
+
+
+def warm_up_pdf_workers():
+    """Arranca el forkserver y los workers de PDF al iniciar el servidor, fuera de la primera petición"""
+    if PDF_PARSE_WORKERS > 1:
+        pool = _get_pdf_pool()
+        for future in [pool.submit(len, b"") for _ in range(PDF_PARSE_WORKERS)]:
+            future.result()
+
+
+def _parse_pdf(file_bytes: bytes) -> List[str]:
+    page_count = len(PdfReader(io.BytesIO(file_bytes)).pages)
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_PARSE_WORKERS <= 1:
+        return extract_pdf_pages(file_bytes, 0, page_count)
+
+    step = -(-page_count // PDF_PARSE_WORKERS)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    pool = _get_pdf_pool()
+    futures = [pool.submit(extract_pdf_pages, file_bytes, start, end) for start, end in ranges]
+    return [text for future in futures for text in future.result()]
+
+
+def _parse_uncached(file_bytes: bytes, filename: str, content_hash: str) -> ParsedDocument:
+    ext = get_extension(filename)
+
+    if ext == ".txt":
+        try:
+            page_texts = [file_bytes.decode("utf-8")]
+        except UnicodeDecodeError:
+            page_texts = [file_bytes.decode("latin-1")]
+    elif ext == ".pdf":
+        page_texts = _parse_pdf(file_bytes)
+    elif ext == ".docx":
+        page_texts = [docx2txt.process(io.BytesIO(file_bytes))]
+    else:
+        raise ValueError(f"Formato de archivo no soportado: {ext}")
+
+    pages = tuple(
+        ParsedPage(number=number, text=normalize_text(text))
+        for number, text in enumerate(page_texts)
+    )
+    return ParsedDocument(content_hash=content_hash, filename=filename, pages=pages, size=len(file_bytes))
+
+
+class ParsedDocumentCache:
+    """Caché LRU en memoria de documentos ya parseados, indexada por hash del contenido"""
+
+    def __init__(self, max_entries: int = PARSED_DOCUMENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            document = self._entries.get(key)
+            if document is not None:
+                self._entries.move_to_end(key)
+            return document
+
+    def put(self, key: str, document: ParsedDocument):
+        with self._lock:
+            self._entries[key] = document
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+parsed_document_cache = ParsedDocumentCache()
+
+
+def parse_document(file_bytes: bytes, filename: str) -> ParsedDocument:
+    """Parsea un CV .txt, .pdf o .docx desde memoria, reutilizando el resultado si ya se parseó"""
+    content_hash = hashlib.sha256(file_bytes).hexdigest()
+    # El parser depende de la extensión, así que forma parte de la clave
+    key = f"{content_hash}{get_extension(filename)}"
+
+    document = parsed_document_cache.get(key)
+    CACHE_LOOKUPS.inc(cache="parsed_document", result="hit" if document is not None else "miss")
+    if document is not None:
+        return document
+
+    print(f"Parseando CV {filename}...")
+    file_format = get_extension(filename).lstrip(".")
+    with timed(PARSE_DURATION, "parse", format=file_format):
+        document = _parse_uncached(file_bytes, filename, content_hash)
+    PARSE_BYTES.inc(len(file_bytes), format=file_format)
+    parsed_document_cache.put(key, document)
+    return document
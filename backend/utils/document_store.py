@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Tuple
+from utils.document_parser import ParsedDocument, parse_document
+from utils.config import DOCUMENT_STORE_PATH, DOCUMENT_TTL_SECONDS, DOCUMENT_STORE_MAX_BYTES
+
+
+@dataclass
+class StoredDocument:
+    document_id: str
+    filename: str
+    data: bytes
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+
+
+class DocumentStore:
+    """Almacén de los CV subidos en SQLite, con expiración por inactividad y límite de tamaño total.
+
+    El identificador es el hash del contenido, así que subir el mismo archivo dos veces reutiliza
+    el documento, y en modo WAL la base de datos se comparte entre los workers de uvicorn.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DOCUMENT_STORE_PATH,
+        ttl_seconds: int = DOCUMENT_TTL_SECONDS,
+        max_bytes: int = DOCUMENT_STORE_MAX_BYTES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                document_id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_id(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def add(self, data: bytes, filename: str) -> StoredDocument:
+        """Guarda el documento, si no estaba ya, y devuelve su identificador"""
+        document_id = self.make_id(data)
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE documents SET filename = ?, last_access = ? WHERE document_id = ?",
+                (filename, now, document_id)
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO documents (document_id, filename, data, size, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (document_id, filename, data, len(data), now, now)
+                )
+                self._evict(now)
+            self._conn.commit()
+            row = self._conn.execute("SELECT created_at FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        created_at = row[0] if row is not None else now
+        return StoredDocument(
+            document_id=document_id, filename=filename, data=data, created_at=created_at, last_access=now
+        )
+
+    def get(self, document_id: str) -> StoredDocument:
+        """Devuelve el documento o lanza KeyError si no existe o ha expirado"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename, data, created_at FROM documents WHERE document_id = ? AND last_access >= ?",
+                (document_id, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Documento no encontrado o expirado: {document_id}")
+            self._conn.execute("UPDATE documents SET last_access = ? WHERE document_id = ?", (now, document_id))
+            self._conn.commit()
+        filename, data, created_at = row
+        return StoredDocument(
+            document_id=document_id, filename=filename, data=data, created_at=created_at, last_access=now
+        )
+
+    def delete(self, document_id: str) -> bool:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM documents WHERE document_id = ?", (document_id,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def _evict(self, now: float):
+        """Elimina los documentos sin uso reciente y, si se supera el tamaño máximo, los más antiguos"""
+        self._conn.execute("DELETE FROM documents WHERE last_access < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM documents WHERE document_id IN ("
+            "SELECT document_id FROM ("
+            "SELECT document_id, SUM(size) OVER (ORDER BY last_access DESC, document_id) AS total FROM documents"
+            ") WHERE total > ?)",
+            (self.max_bytes,)
+        )
+
+
+document_store = DocumentStore()
+
+
+def read_cv_source(document_id: str = "", cv_file_path: str = "") -> Tuple[bytes, str]:
+    """Obtiene los bytes y el nombre del CV a partir de su identificador o, si no lo hay, de su ruta local"""
+    if document_id:
+        document = document_store.get(document_id)
+        return document.data, document.filename
+
+    if cv_file_path and os.path.exists(cv_file_path):
+        with open(cv_file_path, "rb") as cv_file:
+            return cv_file.read(), os.path.basename(cv_file_path)
+
+    raise FileNotFoundError("No se indicó un documento subido ni una ruta de CV existente.")
+
+
+def load_parsed_cv(document_id: str = "", cv_file_path: str = "") -> ParsedDocument:
+    """Devuelve el CV parseado, reutilizando el texto ya extraído si el contenido no ha cambiado"""
+    file_bytes, filename = read_cv_source(document_id, cv_file_path)
+    return parse_document(file_bytes, filename)
+
+
+def document_thread_id(graph: str, document_id: str = "", cv_file_path: str = "", fallback_text: str = "") -> str:
+    """Identificador de hilo del checkpointer: uno por grafo y contenido del CV, no por petición"""
+    try:
+        file_bytes, _ = read_cv_source(document_id, cv_file_path)
+    except (KeyError, FileNotFoundError):
+        file_bytes = (fallback_text or "").encode("utf-8")
+    return f"{graph}:{hashlib.sha256(file_bytes).hexdigest()}"
@@ -0,0 +1,65 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingBatcher(Embeddings):
+    """Agrupa en un solo lote los embeddings solicitados por análisis concurrentes"""
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 10):
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Encola los textos y espera a que el lote que los contiene sea procesado"""
+        if not texts:
+            return []
+
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def embed_query(self, text: str) -> List[float]:
+        # Las consultas son cortas y llevan su propia instrucción, no merece la pena agruparlas
+        return self.embeddings.embed_query(text)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            batch_size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+
+            while batch_size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                batch_size += len(item[0])
+
+            self._process(batch)
+
+    def _process(self, batch):
+        """Calcula los embeddings del lote completo y reparte los vectores a cada solicitante"""
+        all_texts = [text for texts, _ in batch for text in texts]
+        try:
+            vectors = self.embeddings.embed_documents(all_texts)
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+
+        offset = 0
+        for texts, future in batch:
+            future.set_result(vectors[offset:offset + len(texts)])
+            offset += len(texts)
@@ -0,0 +1,59 @@
+import threading
+from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_DEVICE, EMBEDDING_BATCHING,
+    EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_WAIT_MS
+)
+
+_embeddings = None
+_embeddings_lock = threading.Lock()
+
+
+def _cuda_available() -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def resolve_device(preferred: str = EMBEDDING_DEVICE) -> str:
+    """Determina el dispositivo del modelo de embeddings, con CPU como respaldo"""
+    if preferred == "auto":
+        return "cuda" if _cuda_available() else "cpu"
+
+    if preferred.startswith("cuda") and not _cuda_available():
+        print(f"Dispositivo {preferred} no disponible, usando CPU para los embeddings.")
+        return "cpu"
+
+    return preferred
+
+
+def get_embeddings():
+    """Devuelve el modelo de embeddings compartido por el proceso, cargándolo la primera vez"""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                device = resolve_device()
+                print(f"Cargando modelo de embeddings {EMBEDDING_MODEL_NAME} en {device}...")
+                embeddings = HuggingFaceBgeEmbeddings(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    model_kwargs={'device': device},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+                if EMBEDDING_BATCHING:
+                    embeddings = EmbeddingBatcher(
+                        embeddings,
+                        max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+                        max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS
+                    )
+                _embeddings = embeddings
+    return _embeddings
+
+
+def warm_up_embeddings():
+    """Carga el modelo y ejecuta una inferencia de prueba para evitar la latencia en la primera petición"""
+    get_embeddings().embed_query("curriculum vitae")
+    print("Modelo de embeddings precalentado.")
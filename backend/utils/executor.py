@@ -0,0 +1,21 @@
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import BLOCKING_EXECUTOR_WORKERS
+
+_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_EXECUTOR_WORKERS,
+    thread_name_prefix="joblens-blocking"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Ejecuta una función bloqueante en el pool acotado sin detener el event loop.
+
+    La función se ejecuta en una copia del contexto actual, así que ve las mismas variables de
+    contexto que la petición (por ejemplo, sus tiempos por fase).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,134 @@
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from typing import Optional
+from langchain_community.vectorstores import FAISS
+from utils.config import (
+    INDEX_CACHE_DIR, INDEX_CACHE_MAX_ENTRIES,
+    INDEX_CACHE_MAX_BYTES, INDEX_CACHE_MAX_AGE_SECONDS
+)
+
+INDEX_FILE_NAME = "index.faiss"
+
+
+class FAISSIndexCache:
+    """Caché persistente de índices FAISS indexada por el hash del contenido del CV"""
+
+    def __init__(
+        self,
+        cache_dir: str = INDEX_CACHE_DIR,
+        max_entries: int = INDEX_CACHE_MAX_ENTRIES,
+        max_bytes: int = INDEX_CACHE_MAX_BYTES,
+        max_age_seconds: int = INDEX_CACHE_MAX_AGE_SECONDS
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, model_name: str, chunk_size: int, chunk_overlap: int) -> str:
+        """Genera la clave a partir del hash del archivo, el modelo y la configuración del splitter"""
+        digest = hashlib.sha256()
+        digest.update(f"{content_hash}|{model_name}|{chunk_size}|{chunk_overlap}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _is_expired(self, path: str, now: float) -> bool:
+        # La fecha del archivo del índice marca la creación; la del directorio, el último acceso.
+        # Una entrada sin archivo de índice (copia parcial, limpieza manual) cuenta como expirada
+        try:
+            created_at = os.path.getmtime(os.path.join(path, INDEX_FILE_NAME))
+        except OSError:
+            return True
+        return now - created_at > self.max_age_seconds
+
+    def _is_valid(self, path: str) -> bool:
+        """Comprueba la entrada con el lock tomado y elimina la que esté expirada o incompleta"""
+        if not os.path.isdir(path):
+            return False
+        if self._is_expired(path, time.time()):
+            shutil.rmtree(path, ignore_errors=True)
+            return False
+        return True
+
+    def contains(self, key: str) -> bool:
+        """Indica si existe una entrada válida para la clave"""
+        with self._lock:
+            return self._is_valid(self._entry_path(key))
+
+    def get(self, key: str, embeddings) -> Optional[FAISS]:
+        """Devuelve el índice FAISS en caché o None si no existe o ha expirado"""
+        path = self._entry_path(key)
+        with self._lock:
+            if not self._is_valid(path):
+                return None
+            os.utime(path, None)
+
+        # La carga se hace fuera del lock; si un desalojo concurrente borra la entrada, es un fallo de caché
+        try:
+            return FAISS.load_local(
+                folder_path=path,
+                embeddings=embeddings,
+                allow_dangerous_deserialization=True
+            )
+        except (OSError, RuntimeError) as error:
+            print(f"No se pudo cargar el índice en caché {key} ({error}), se reconstruye.")
+            return None
+
+    def put(self, key: str, vectors: FAISS):
+        """Guarda el índice en caché de forma atómica y aplica la política de desalojo"""
+        path = self._entry_path(key)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        vectors.save_local(tmp_path)
+
+        with self._lock:
+            if os.path.isdir(path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            else:
+                os.rename(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        """Elimina entradas expiradas y, después, las menos usadas hasta respetar los límites"""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if ".tmp-" in name or not os.path.isdir(path):
+                continue
+            if not os.path.exists(os.path.join(path, INDEX_FILE_NAME)) or self._is_expired(path, now):
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, file_name))
+                for file_name in os.listdir(path)
+            )
+            entries.append((os.path.getmtime(path), size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total_bytes -= size
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_index_cache() -> FAISSIndexCache:
+    """Devuelve la caché de índices compartida por todo el proceso"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = FAISSIndexCache()
+        return _default_cache
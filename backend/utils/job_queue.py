@@ -0,0 +1,170 @@
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+from utils.admission import Overloaded
+from utils.llm_pool import get_client_id, set_client_id
+from utils.metrics import JOB_QUEUE_WAIT, JOB_DURATION, JOBS_REJECTED, start_request_timings
+from utils.config import (
+    JOB_WORKERS, JOB_MAX_QUEUED, JOB_RESULT_TTL_SECONDS, JOB_MAX_RETAINED, JOB_MAX_WAIT_SECONDS
+)
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+@dataclass
+class Job:
+    job_id: str
+    kind: str
+    payload: dict
+    client_id: str
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: str = ""
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "output": self.result,
+            "error": self.error,
+            "timings_ms": self.timings_ms,
+        }
+
+
+class JobQueue:
+    """Cola local de trabajos: un pool de workers ejecuta los grafos fuera de la petición HTTP
+    y los resultados se guardan durante la ventana de retención para consultarlos después"""
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_MAX_QUEUED,
+        result_ttl: int = JOB_RESULT_TTL_SECONDS,
+        max_retained: int = JOB_MAX_RETAINED
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self._handlers: Dict[str, Callable[[dict], Awaitable[dict]]] = {}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: Callable[[dict], Awaitable[dict]]):
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return list(self._handlers)
+
+    def start(self):
+        """Arranca los workers en el bucle de eventos actual"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, payload: dict) -> Job:
+        """Encola un trabajo o lanza Overloaded si la cola está llena"""
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de trabajo no soportado: {kind}")
+        if self._queue is None:
+            self.start()
+        if self._queue.qsize() >= self.max_queued:
+            JOBS_REJECTED.inc(kind=kind)
+            raise Overloaded("job_queue_full", retry_after=max(1, int(JOB_MAX_WAIT_SECONDS)))
+
+        self._purge()
+        # El trabajo hereda el cliente de la petición para respetar su límite en el pool del LLM
+        job = Job(job_id=uuid.uuid4().hex, kind=kind, payload=payload, client_id=get_client_id())
+        self._jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Trabajo no encontrado o expirado: {job_id}")
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Job:
+        """Long-poll: devuelve el trabajo al terminar o cuando se agota la espera"""
+        job = self.get(job_id)
+        if not job.finished and timeout > 0:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=min(timeout, JOB_MAX_WAIT_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def _purge(self):
+        # Solo se descartan trabajos terminados; los pendientes siguen en la cola hasta ejecutarse
+        expire_before = time.time() - self.result_ttl
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(self._jobs) - self.max_retained
+        for job in finished:
+            if job.finished_at < expire_before or excess > 0:
+                del self._jobs[job.job_id]
+                excess -= 1
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        JOB_QUEUE_WAIT.observe(job.started_at - job.created_at, kind=job.kind)
+        set_client_id(job.client_id)
+        timings = start_request_timings()
+        try:
+            job.result = await self._handlers[job.kind](job.payload)
+            job.status = "succeeded"
+        except Exception as error:
+            print(f"Error en el trabajo {job.job_id} ({job.kind}): {error}")
+            job.error = str(error)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            job.timings_ms = {phase: round(seconds * 1000, 1) for phase, seconds in timings.items()}
+            JOB_DURATION.observe(job.finished_at - job.started_at, kind=job.kind, status=job.status)
+            job.done.set()
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Devuelve la cola de trabajos compartida por el proceso"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
@@ -0,0 +1,162 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langchain_groq import ChatGroq
+from dotenv import load_dotenv
+from utils.config import (
+    THREAD_CONFIG, LLM_MODEL_NAME, LLM_CACHE_ENABLED, LLM_ROUTING, LLM_MODEL_TIERS, LLM_NODE_TIERS,
+    LLM_FALLBACK_TIERS, LLM_FALLBACK_ENABLED, LLM_TIER_TIMEOUT_SECONDS
+)
+from utils.executor import run_blocking
+from utils.llm_cache import CacheLookup, get_llm_cache
+from utils.metrics import (
+    LLM_DURATION, LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS, LLM_FALLBACKS, CACHE_LOOKUPS, timed
+)
+from utils.token_budget import count_tokens
+from utils.llm_pool import LLMStreamInterrupted, get_llm_pool, retry_reason
+from utils.streaming import is_streaming, emit_event
+
+load_dotenv()
+
+_llms: Dict[str, BaseChatModel] = {}
+_llm_override: Optional[BaseChatModel] = None
+_llm_lock = threading.Lock()
+
+
+def get_llm(model_name: str = LLM_MODEL_NAME) -> BaseChatModel:
+    """Devuelve el modelo de chat indicado, creando su cliente de Groq la primera vez"""
+    with _llm_lock:
+        if _llm_override is not None:
+            return _llm_override
+        if model_name not in _llms:
+            # Los reintentos los gestiona el pool; los del cliente de Groq los multiplicarían
+            _llms[model_name] = ChatGroq(model=model_name, max_retries=0)
+        return _llms[model_name]
+
+
+def set_llm(model: BaseChatModel):
+    """Sustituye todos los modelos de chat, por ejemplo por uno simulado en los benchmarks"""
+    global _llm_override
+    with _llm_lock:
+        _llm_override = model
+
+
+def route_models(node: str) -> List[Tuple[str, float]]:
+    """Modelos que puede usar el nodo, el principal primero, cada uno con su timeout"""
+    if not LLM_ROUTING:
+        return [(LLM_MODEL_NAME, 0.0)]
+    tier = LLM_NODE_TIERS.get(node, "fast")
+    routes = [(LLM_MODEL_TIERS[tier], LLM_TIER_TIMEOUT_SECONDS[tier])]
+    fallback = LLM_FALLBACK_TIERS.get(tier)
+    if LLM_FALLBACK_ENABLED and fallback and LLM_MODEL_TIERS[fallback] != routes[0][0]:
+        routes.append((LLM_MODEL_TIERS[fallback], LLM_TIER_TIMEOUT_SECONDS[fallback]))
+    return routes
+
+
+def primary_model(node: str) -> str:
+    return route_models(node)[0][0]
+
+
+async def _request_llm(prompt: str, node: str, model_name: str, timeout: float) -> str:
+    messages = [HumanMessage(content=prompt)]
+    llm = get_llm(model_name)
+    timeout = timeout or None
+
+    with timed(LLM_DURATION, "llm", node=node, model=model_name):
+        if not is_streaming():
+            response = await asyncio.wait_for(llm.ainvoke(messages, config=THREAD_CONFIG), timeout)
+            return response.content
+
+        chunks = []
+        stream = llm.astream(messages, config=THREAD_CONFIG).__aiter__()
+        try:
+            while True:
+                # El timeout solo cubre la espera del primer token; después la generación sigue su ritmo
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), None if chunks else timeout)
+                except StopAsyncIteration:
+                    break
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    emit_event("token", node=node, content=chunk.content)
+        except Exception as error:
+            # Con tokens ya enviados, un reintento los duplicaría en el cliente
+            if chunks:
+                raise LLMStreamInterrupted(f"El stream de {node} se interrumpió: {error}") from error
+            raise
+        return "".join(chunks)
+
+
+async def _request_with_fallback(prompt: str, node: str) -> Tuple[str, str]:
+    """Prueba el modelo principal y, si falla o tarda demasiado, el alternativo; devuelve la respuesta y el modelo"""
+    routes = route_models(node)
+    for index, (model_name, timeout) in enumerate(routes):
+        try:
+            return await _request_llm(prompt, node, model_name, timeout), model_name
+        except Exception as error:
+            reason = retry_reason(error)
+            if reason is None or index == len(routes) - 1:
+                raise
+            LLM_FALLBACKS.inc(node=node, model=model_name, reason=reason)
+            print(f"Modelo {model_name} no disponible para {node} ({reason}), usando {routes[index + 1][0]}.")
+
+
+async def _call_llm(prompt: str, node: str) -> Tuple[str, str]:
+    prompt_tokens = await run_blocking(count_tokens, prompt)
+    content, model_name = await get_llm_pool().run(
+        lambda: _request_with_fallback(prompt, node), node, prompt_tokens
+    )
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, node=node)
+    LLM_COMPLETION_TOKENS.inc(await run_blocking(count_tokens, content), node=node)
+    return content, model_name
+
+
+async def generate_with_model(prompt: str, node: str, cache_inputs: Optional[dict] = None) -> Tuple[str, str]:
+    """Como `generate`, pero devuelve también el modelo que respondió (el principal en un acierto de caché)"""
+    if cache_inputs is None or not LLM_CACHE_ENABLED:
+        return await _call_llm(prompt, node)
+
+    cache = get_llm_cache()
+    lookup = await run_blocking(cache.lookup, node, primary_model(node), cache_inputs)
+    CACHE_LOOKUPS.inc(cache="llm", result="hit" if lookup.response is not None else "miss")
+    if lookup.response is not None:
+        print(f"Respuesta de {node} recuperada de la caché.")
+        emit_event("token", node=node, content=lookup.response)
+        return lookup.response, primary_model(node)
+
+    content, model_name = await _call_llm(prompt, node)
+    # Una respuesta del modelo alternativo no se guarda bajo la clave del principal
+    if model_name == primary_model(node):
+        await run_blocking(cache.store, lookup, content)
+    return content, model_name
+
+
+async def generate(prompt: str, node: str, cache_inputs: Optional[dict] = None) -> str:
+    """Envía el prompt al LLM y, si hay un cliente escuchando, retransmite los tokens según llegan.
+
+    Si se indican `cache_inputs`, la respuesta se busca y se guarda en la caché de respuestas
+    usando esas entradas, el modelo y la versión de la plantilla del nodo como clave.
+    """
+    content, _ = await generate_with_model(prompt, node, cache_inputs)
+    return content
+
+
+async def cache_lookup(node: str, cache_inputs: dict, llm_node: Optional[str] = None) -> Optional[CacheLookup]:
+    """Busca en la caché una respuesta exacta para las entradas; devuelve None si la caché está desactivada.
+
+    `llm_node` es el nodo que genera la respuesta, cuyo modelo forma parte de la clave.
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+    model_name = primary_model(llm_node or node)
+    lookup = await run_blocking(get_llm_cache().lookup, node, model_name, cache_inputs, False)
+    CACHE_LOOKUPS.inc(cache="llm", result="hit" if lookup.response is not None else "miss")
+    return lookup
+
+
+async def cache_store(lookup: Optional[CacheLookup], response: str):
+    """Guarda una respuesta obtenida fuera de `generate`, como cada sección de una respuesta estructurada"""
+    if lookup is not None:
+        await run_blocking(get_llm_cache().store, lookup, response)
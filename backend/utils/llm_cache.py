@@ -0,0 +1,154 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import NamedTuple, Optional
+import numpy as np
+from utils.embeddings import get_embeddings
+from utils.config import (
+    LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_SEMANTIC, LLM_CACHE_SEMANTIC_NODES, LLM_CACHE_SIMILARITY_THRESHOLD, PROMPT_VERSIONS
+)
+
+# Tamaño de los fragmentos con que se calcula el embedding de las entradas; el modelo
+# trunca cada texto, así que promediar fragmentos representa el documento completo
+SEMANTIC_CHUNK_SIZE = 800
+
+
+class CacheLookup(NamedTuple):
+    key: str
+    scope: str
+    embedding: Optional[bytes]
+    response: Optional[str]
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza espacios para que variaciones de formato no cambien la clave"""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class LLMResponseCache:
+    """Caché persistente de respuestas del LLM con TTL, desalojo LRU y nivel semántico opcional"""
+
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_PATH,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        semantic: bool = LLM_CACHE_SEMANTIC,
+        similarity_threshold: float = LLM_CACHE_SIMILARITY_THRESHOLD,
+        semantic_nodes: tuple = LLM_CACHE_SEMANTIC_NODES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic = semantic
+        self.semantic_nodes = frozenset(semantic_nodes)
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_scope(node: str, model: str) -> str:
+        """Agrupa las entradas comparables: mismo nodo, modelo y versión de plantilla"""
+        return f"{node}:{model}:v{PROMPT_VERSIONS.get(node, 1)}"
+
+    @staticmethod
+    def make_key(scope: str, inputs: dict) -> str:
+        normalized = {name: normalize_text(value) for name, value in sorted(inputs.items())}
+        payload = json.dumps({"scope": scope, "inputs": normalized}, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _embed_inputs(self, inputs: dict) -> bytes:
+        text = normalize_text(" ".join(value or "" for _, value in sorted(inputs.items())))
+        chunks = [text[i:i + SEMANTIC_CHUNK_SIZE] for i in range(0, len(text), SEMANTIC_CHUNK_SIZE)] or [""]
+        vectors = np.array(get_embeddings().embed_documents(chunks), dtype=np.float32)
+        vector = vectors.mean(axis=0)
+        vector /= np.linalg.norm(vector) or 1.0
+        return vector.tobytes()
+
+    def lookup(self, node: str, model: str, inputs: dict, semantic: Optional[bool] = None) -> CacheLookup:
+        """Busca una respuesta exacta y, si el nivel semántico aplica al nodo, una de entradas casi idénticas"""
+        scope = self.make_scope(node, model)
+        key = self.make_key(scope, inputs)
+        now = time.time()
+        min_created_at = now - self.ttl_seconds
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+                (key, min_created_at)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                return CacheLookup(key, scope, None, row[0])
+
+        # El nivel semántico solo aplica a los nodos permitidos; el resto exige coincidencia exacta
+        use_semantic = (self.semantic if semantic is None else semantic) and node in self.semantic_nodes
+        if not use_semantic:
+            return CacheLookup(key, scope, None, None)
+
+        embedding = self._embed_inputs(inputs)
+        query = np.frombuffer(embedding, dtype=np.float32)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response, embedding FROM responses "
+                "WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ?",
+                (scope, min_created_at)
+            ).fetchall()
+            if not rows:
+                return CacheLookup(key, scope, embedding, None)
+
+            matrix = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return CacheLookup(key, scope, embedding, None)
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, rows[best][0]))
+            self._conn.commit()
+            return CacheLookup(key, scope, embedding, rows[best][1])
+
+    def store(self, lookup: CacheLookup, response: str):
+        """Guarda la respuesta del LLM y aplica la expiración y el desalojo LRU"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, response, embedding, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (lookup.key, lookup.scope, response, lookup.embedding, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Devuelve la caché de respuestas compartida por todo el proceso"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
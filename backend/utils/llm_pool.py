@@ -0,0 +1,159 @@
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional, TypeVar
+from utils.metrics import LLM_QUEUE_WAIT, LLM_RETRIES
+from utils.config import (
+    LLM_MAX_CONCURRENCY, LLM_MAX_CONCURRENCY_PER_CLIENT, LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE, LLM_ESTIMATED_COMPLETION_TOKENS, LLM_RETRY_ATTEMPTS,
+    LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS
+)
+
+T = TypeVar("T")
+
+RETRYABLE_ERROR_NAMES = ("RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError")
+
+_client_id = contextvars.ContextVar("joblens_client_id", default="anonymous")
+
+
+def set_client_id(client_id: str):
+    """Asocia la petición actual a un cliente para aplicarle su límite de concurrencia"""
+    _client_id.set(client_id or "anonymous")
+
+
+def get_client_id() -> str:
+    return _client_id.get()
+
+
+class LLMStreamInterrupted(RuntimeError):
+    """El stream falló después de enviar tokens al cliente, así que no se puede reintentar"""
+
+
+class TokenBucket:
+    """Cubo de tokens que se rellena de forma continua a `per_minute` unidades por minuto"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        # Una petición mayor que la cuota entera nunca cabría; se limita a la capacidad
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+
+def retry_reason(error: Exception) -> Optional[str]:
+    """Devuelve el motivo si el error es transitorio (límite de cuota, timeout, error del servidor)"""
+    if isinstance(error, LLMStreamInterrupted):
+        return None
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return "timeout"
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status == 429:
+        return "rate_limit"
+    if isinstance(status, int) and status >= 500:
+        return "server_error"
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return "rate_limit" if type(error).__name__ == "RateLimitError" else "transient"
+    return None
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Espera antes del reintento: la indicada por el proveedor o un backoff exponencial con jitter"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(LLM_RETRY_MAX_SECONDS, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+class LLMPool:
+    """Reparte las llamadas al LLM respetando la concurrencia global y por cliente y las cuotas del proveedor"""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_concurrency_per_client: int = LLM_MAX_CONCURRENCY_PER_CLIENT,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        retry_attempts: int = LLM_RETRY_ATTEMPTS
+    ):
+        self.max_concurrency_per_client = max_concurrency_per_client
+        self.retry_attempts = retry_attempts
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._clients = {}
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+    @asynccontextmanager
+    async def _client_slot(self, client_id: str):
+        # Solo se guardan los semáforos de clientes con llamadas en curso o en espera
+        entry = self._clients.get(client_id)
+        if entry is None:
+            entry = self._clients[client_id] = [asyncio.Semaphore(self.max_concurrency_per_client), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._clients[client_id]
+
+    async def _acquire_quota(self, prompt_tokens: int):
+        if self._request_bucket is not None:
+            await self._request_bucket.acquire(1)
+        if self._token_bucket is not None:
+            await self._token_bucket.acquire(prompt_tokens + LLM_ESTIMATED_COMPLETION_TOKENS)
+
+    async def run(self, call: Callable[[], Awaitable[T]], node: str, prompt_tokens: int) -> T:
+        """Ejecuta la llamada cuando hay hueco y cuota, reintentando los errores transitorios"""
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            async with self._client_slot(_client_id.get()):
+                # La cuota se espera antes de ocupar un hueco global: un cliente frenado no bloquea al resto
+                await self._acquire_quota(prompt_tokens)
+                async with self._global:
+                    LLM_QUEUE_WAIT.observe(time.perf_counter() - started, node=node)
+                    try:
+                        return await call()
+                    except Exception as error:
+                        reason = retry_reason(error)
+                        if reason is None or attempt >= self.retry_attempts:
+                            raise
+                        delay = retry_delay(error, attempt)
+
+            # Se espera fuera del pool para no ocupar un hueco durante el backoff
+            attempt += 1
+            LLM_RETRIES.inc(node=node, reason=reason)
+            print(f"Llamada al LLM de {node} fallida ({reason}), reintento {attempt} en {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_llm_pool() -> LLMPool:
+    """Devuelve el pool de llamadas al LLM compartido por todo el proceso"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = LLMPool()
+        return _pool
@@ -0,0 +1,157 @@
+import time
+import bisect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+# Límites de los histogramas en segundos: desde un parseo en caché hasta una llamada larga al LLM
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_request_timings = contextvars.ContextVar("joblens_request_timings", default=None)
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Cada serie guarda los conteos por bucket (no acumulados), la suma y el total
+            counts, total = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), [0.0, 0]])
+            counts[index] += 1
+            total[0] += value
+            total[1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (value_sum, value_count)) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {value_count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {value_sum}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {value_count}")
+        return "\n".join(lines)
+
+
+NODE_DURATION = Histogram("joblens_node_duration_seconds", "Duración de cada nodo de los grafos", ("node",))
+LLM_DURATION = Histogram("joblens_llm_duration_seconds", "Duración de las llamadas al LLM", ("node", "model"))
+LLM_PROMPT_TOKENS = Counter("joblens_llm_prompt_tokens_total", "Tokens enviados al LLM", ("node",))
+LLM_COMPLETION_TOKENS = Counter("joblens_llm_completion_tokens_total", "Tokens generados por el LLM", ("node",))
+CACHE_LOOKUPS = Counter("joblens_cache_lookups_total", "Consultas a las cachés por resultado", ("cache", "result"))
+FAISS_DURATION = Histogram("joblens_faiss_duration_seconds", "Construcción y carga de índices FAISS", ("operation",))
+PARSE_DURATION = Histogram("joblens_parse_duration_seconds", "Duración del parseo de documentos", ("format",))
+PARSE_BYTES = Counter("joblens_parse_bytes_total", "Bytes de documentos parseados", ("format",))
+LLM_QUEUE_WAIT = Histogram("joblens_llm_queue_seconds", "Espera en el pool antes de llamar al LLM", ("node",))
+LLM_FALLBACKS = Counter(
+    "joblens_llm_fallbacks_total", "Llamadas repetidas con el modelo alternativo", ("node", "model", "reason")
+)
+LLM_RETRIES = Counter("joblens_llm_retries_total", "Reintentos de llamadas al LLM", ("node", "reason"))
+ADMISSION_REJECTED = Counter("joblens_admission_rejected_total", "Peticiones rechazadas con 429", ("reason",))
+JOB_QUEUE_WAIT = Histogram("joblens_job_queue_seconds", "Espera de los trabajos antes de ejecutarse", ("kind",))
+JOB_DURATION = Histogram("joblens_job_duration_seconds", "Duración de los trabajos en segundo plano", ("kind", "status"))
+JOBS_REJECTED = Counter("joblens_jobs_rejected_total", "Trabajos rechazados con la cola llena", ("kind",))
+HTTP_DURATION = Histogram(
+    "joblens_http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "path", "status")
+)
+
+REGISTRY = (
+    NODE_DURATION, LLM_DURATION, LLM_PROMPT_TOKENS, LLM_COMPLETION_TOKENS, CACHE_LOOKUPS,
+    FAISS_DURATION, PARSE_DURATION, PARSE_BYTES, LLM_QUEUE_WAIT, LLM_RETRIES, LLM_FALLBACKS,
+    ADMISSION_REJECTED, JOB_QUEUE_WAIT, JOB_DURATION, JOBS_REJECTED, HTTP_DURATION
+)
+
+
+def render_metrics() -> str:
+    """Exporta todas las métricas en el formato de texto de Prometheus"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def start_request_timings() -> dict:
+    """Empieza a acumular los tiempos por fase de la petición actual"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings() -> Optional[dict]:
+    return _request_timings.get()
+
+
+def _record_request_timing(phase: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+@contextmanager
+def timed(histogram: Histogram, phase: str, **labels):
+    """Mide el bloque en el histograma y lo suma a los tiempos de la petición actual"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed, **labels)
+        _record_request_timing(phase, elapsed)
+
+
+def timed_node(name: str, node):
+    """Envuelve un nodo asíncrono del grafo para medir su duración"""
+    @functools.wraps(node)
+    async def wrapper(state):
+        with timed(NODE_DURATION, f"node_{name}", node=name):
+            return await node(state)
+    return wrapper
+
+
+def format_server_timing(timings: dict) -> str:
+    """Convierte los tiempos acumulados en el valor de la cabecera Server-Timing (en ms)"""
+    return ", ".join(f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in timings.items())
@@ -1,42 +1,113 @@
 from utils.react_state import State
 from utils.vector_store_manager import CVEmbeddingManager
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_groq import ChatGroq
-from dotenv import load_dotenv
-from utils.config import THREAD_CONFIG
+from utils.document_store import load_parsed_cv
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.graph import END
+from utils.executor import run_blocking
+from utils.llm import generate
+from utils.cv_heuristics import classify_cv, lean_cv_validity
+from utils.token_budget import count_tokens, budget_inputs
+from utils.text_store import get_text_store
+from utils.config import (
+    EXTRACTION_STRATEGY, FULL_TEXT_TOKEN_BUDGET,
+    MESSAGE_PREVIEW_CHARS, CV_CONTENT_PREVIEW_CHARS
+)
+from typing import Optional, Tuple
 import json
+import re
+import uuid
 
-load_dotenv()
+# Prefijo del id del mensaje especulativo, para poder retirarlo del historial si el CV no es válido
+DRAFT_MESSAGE_PREFIX = "draft_result:"
 
-llm = ChatGroq(model="llama-3.1-8b-instant")
+def _extract_cv_text(document_id: str, cv_file_path: str) -> str:
+    document = load_parsed_cv(document_id, cv_file_path)
+    full_text = document.text
 
-def extract_cv_content(state: State):
-    """Extrae el contenido completo del CV usando el retriever"""
-    print("1. Extraer contenido del CV")
+    use_full_text = EXTRACTION_STRATEGY == "full" or (
+        EXTRACTION_STRATEGY == "auto" and count_tokens(full_text) <= FULL_TEXT_TOKEN_BUDGET
+    )
+    if use_full_text:
+        print("El CV cabe en el presupuesto de tokens, se usa el texto completo.")
+        return full_text
 
     cv_manager = CVEmbeddingManager()
-    cv_manager.embed_and_store_cv(state["cv_file_path"])
+    cv_manager.embed_and_store_cv(document)
     retriever = cv_manager.get_retriever(k=3)
-    
+
     docs = retriever.invoke("curriculum vitae experiencia educación habilidades")
-    cv_text = "\n".join([doc.page_content for doc in docs])
+    return "\n".join([doc.page_content for doc in docs])
+
+def preview(text: str, limit: int = MESSAGE_PREVIEW_CHARS) -> str:
+    """Recorta textos largos para los mensajes del historial; el texto completo ya está en su campo"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+async def load_cv_content(state: State) -> str:
+    """Recupera del almacén de textos el contenido del CV referenciado en el estado"""
+    return await run_blocking(get_text_store().get, state["cv_content_ref"])
+
+async def resume_from_checkpoint(state: State):
+    """Punto de entrada: conserva el estado guardado del mismo CV, si lo hay"""
+    print("0. Comprobar si el CV ya fue analizado")
+    cv_content_ref = state.get("cv_content_ref", "")
+    if cv_content_ref and not await run_blocking(get_text_store().contains, cv_content_ref):
+        print("El contenido del CV guardado ha expirado, se vuelve a extraer.")
+        cv_content_ref = ""
+    return {"document_id": state.get("document_id", ""), "cv_content_ref": cv_content_ref}
+
+def route_entry(state: State):
+    """Reutiliza la extracción y la validación guardadas del CV; si no las hay, empieza de cero"""
+    if not state.get("cv_content_ref") or state.get("is_cv_valid") is None:
+        return "extract"
+
+    print("CV ya validado en un análisis anterior, se reutiliza su estado.")
+    if not state["is_cv_valid"]:
+        return "feedback"
+    if state.get("person_is_postuled_to_job"):
+        return "analysis"
+    return "summary"
+
+async def extract_cv_content(state: State):
+    """Extrae el contenido del CV: texto completo si es corto o fragmentos recuperados si no lo es"""
+    print("1. Extraer contenido del CV")
+
+    cv_text = await run_blocking(_extract_cv_text, state.get("document_id", ""), state["cv_file_path"])
+    cv_content_ref = await run_blocking(get_text_store().put, cv_text)
     
     return {
-        "cv_content": cv_text,
-        "messages": state["messages"]
+        "cv_content_ref": cv_content_ref,
+        "cv_content_preview": preview(cv_text, CV_CONTENT_PREVIEW_CHARS)
     }
 
-def validate_cv_structure(state: State):
+def parse_validation_response(response: str) -> Optional[bool]:
+    """Extrae `is_cv_valid` de la respuesta del LLM; devuelve None si no es un JSON válido"""
+    match = re.search(r"\{.*?\}", response, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        result = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    is_cv_valid = result.get("is_cv_valid") if isinstance(result, dict) else None
+    return is_cv_valid if isinstance(is_cv_valid, bool) else None
+
+async def validate_cv_structure(state: State):
     """Valida si el CV tiene la estructura correcta e información importante"""
     print("2. Validar estructura del CV")
-    cv_content = state["cv_content"]
-    
+    cv_content = await load_cv_content(state)
+
+    is_cv_valid = classify_cv(cv_content)
+    if is_cv_valid is not None:
+        print(f"Validación local concluyente, se omite el LLM: {is_cv_valid}")
+        return {"is_cv_valid": is_cv_valid}
+
+    inputs, token_report = await run_blocking(budget_inputs, "validate_structure", cv_content=cv_content)
     validation_prompt = f"""
     Analiza el siguiente CV y determina si tiene una estructura correcta y contiene información importante.
-    Si el documento no es un CV o no tiene apariencia de CV, responde "INCOMPLETO".
+    Si el documento no es un CV o no tiene apariencia de CV, considéralo no válido.
     
     CV a analizar:
-    {cv_content}
+    {inputs["cv_content"]}
     
     Criterios a evaluar:
     1. Información personal (nombre, contacto)
@@ -45,35 +116,35 @@ def validate_cv_structure(state: State):
     4. Habilidades técnicas o competencias
     5. Estructura clara y coherente
     
-    Responde UNICAMENETE en este formato JSON:
-    {{
-        "is_cv_valid": true/false,
-    }}
+    Responde ÚNICAMENTE con este objeto JSON, sin texto adicional:
+    {{"is_cv_valid": true}} o {{"is_cv_valid": false}}
     """
 
-    response = llm.invoke([HumanMessage(content=validation_prompt)], config=THREAD_CONFIG)
+    response = await generate(
+        validation_prompt, node="validate_structure",
+        cache_inputs=inputs
+    )
 
-    try:
-        result = json.loads(response.content.strip())
-        is_cv_valid = result.get("is_cv_valid", False)
-    except:
-        is_cv_valid = False
+    is_cv_valid = parse_validation_response(response)
+    if is_cv_valid is None:
+        print("Respuesta de validación no interpretable, usando la estimación local.")
+        is_cv_valid = lean_cv_validity(cv_content)
     
     return {
         "is_cv_valid": is_cv_valid,
-        "cv_content": cv_content,
-        "messages": state["messages"]
+        "token_usage": {"validate_structure": token_report}
     }
 
-def provide_feedback(state: State):
+async def provide_feedback(state: State):
     """Proporciona retroalimentación sobre qué mejorar en el CV"""
     print("4. Proporcionar retroalimentación sobre el CV")
-    cv_content = state["cv_content"]
+    cv_content = await load_cv_content(state)
+    inputs, token_report = await run_blocking(budget_inputs, "provide_feedback", cv_content=cv_content)
     
     feedback_prompt = f"""
     El siguiente CV tiene estructura incorrecta o le falta información importante:
     
-    {cv_content}
+    {inputs["cv_content"]}
     
     Proporciona retroalimentación específica sobre:
     1. Qué secciones faltan o están incompletas
@@ -84,23 +155,27 @@ def provide_feedback(state: State):
     Sé específico y constructivo en tus recomendaciones.
     """
     
-    response = llm.invoke([HumanMessage(content=feedback_prompt)], config=THREAD_CONFIG)
-    feedback = response.content
+    feedback = await generate(
+        feedback_prompt, node="provide_feedback",
+        cache_inputs=inputs
+    )
     
     return {
         "feedback": feedback,
-        "messages": state["messages"] + [AIMessage(content=f"Retroalimentación del CV:\n{feedback}")]
+        "token_usage": {"provide_feedback": token_report},
+        "messages": [AIMessage(content=f"Retroalimentación del CV:\n{preview(feedback)}")]
     }
 
-def create_cv_summary(state: State):
+async def create_cv_summary(state: State):
     """Crea un resumen de lo más destacado del CV"""
     print("5. Crear resumen del CV")
-    cv_content = state["cv_content"]
+    cv_content = await load_cv_content(state)
+    inputs, token_report = await run_blocking(budget_inputs, "create_summary", cv_content=cv_content)
     
     summary_prompt = f"""
     Crea un resumen profesional destacando los puntos más importantes del siguiente CV:
     
-    {cv_content}
+    {inputs["cv_content"]}
     
     El resumen debe incluir:
     1. Perfil profesional breve
@@ -112,23 +187,26 @@ def create_cv_summary(state: State):
     Presenta la información de manera clara y atractiva, como si fuera para un recruiter.
     """
     
-    response = llm.invoke([HumanMessage(content=summary_prompt)], config=THREAD_CONFIG)
-    summary = response.content
+    summary = await generate(
+        summary_prompt, node="create_summary",
+        cache_inputs=inputs
+    )
     
     return {
         "summary": summary,
-        "messages": state["messages"] + [AIMessage(content=f"Resumen del CV:\n{summary}")]
+        "token_usage": {"create_summary": token_report},
+        "messages": [AIMessage(content=f"Resumen del CV:\n{preview(summary)}")]
     }
 
 def route_after_validation(state: State):
     """Decide si ir al nodo de feedback o al de resumen"""
     print("3. Ruteo después de la validación del CV")
     if state["is_cv_valid"]:
-        return "person_is_postuled_to_job"
+        return "check_postulation"
     else:
         return "provide_feedback"
     
-def person_is_postuled_to_job(state: State):
+async def person_is_postuled_to_job(state: State):
     """Simula que una persona se postula a un trabajo"""
     print("4. Verificar si la persona está postulando a un trabajo")
     decision = state["person_is_postuled_to_job"]
@@ -136,7 +214,7 @@ def person_is_postuled_to_job(state: State):
     return {
         "person_is_postuled_to_job": decision,
         # "person_is_postuled_to_job": decision == "si",
-        "messages": state["messages"] + [HumanMessage(content="Verificando si la persona está postulando a un trabajo...")]
+        "messages": [HumanMessage(content="Verificando si la persona está postulando a un trabajo...")]
     }
 
 def route_after_postuling_to_job(state: State):
@@ -149,7 +227,7 @@ def route_after_postuling_to_job(state: State):
         print("La persona no está postulando a un trabajo.")
         return "create_summary"
     
-def ask_info_about_job(state: State):
+async def ask_info_about_job(state: State):
     """Solicita información sobre el trabajo al que se postula"""
     print("5. Solicitar información sobre el trabajo al que se postula")
     job_info = state["job_info"]
@@ -157,23 +235,25 @@ def ask_info_about_job(state: State):
     print(f"Información del trabajo recibida: {job_info}")
     return {
         "job_info": job_info,
-        "messages": state["messages"] + [HumanMessage(content=f"Información del trabajo recibida: {job_info[:100]}...")]
+        "messages": [HumanMessage(content=f"Información del trabajo recibida: {preview(job_info, 100)}")]
     }
 
-def analyze_cv_job_compatibility(state: State):
-    """Analiza la compatibilidad entre el CV y la oferta laboral"""
-    print("6. Analizar compatibilidad CV-Trabajo")
-    cv_content = state["cv_content"]
-    job_info = state["job_info"]
-    
+async def generate_compatibility_analysis(cv_content: str, job_info: str) -> Tuple[str, dict]:
+    """Pide al LLM el análisis de compatibilidad entre un CV y una oferta laboral.
+
+    Devuelve el análisis junto con el informe de tokens de las entradas ya ajustadas al presupuesto.
+    """
+    inputs, token_report = await run_blocking(
+        budget_inputs, "analyze_compatibility", cv_content=cv_content, job_info=job_info
+    )
     compatibility_prompt = f"""
     Analiza la compatibilidad entre este CV y la oferta laboral:
     
     CV DEL CANDIDATO:
-    {cv_content}
+    {inputs["cv_content"]}
     
     OFERTA LABORAL:
-    {job_info}
+    {inputs["job_info"]}
     
     Proporciona un análisis que incluya:
     1. Porcentaje de compatibilidad (0-100%)
@@ -186,12 +266,54 @@ def analyze_cv_job_compatibility(state: State):
     Sé específico y constructivo.
     """
     
-    response = llm.invoke([HumanMessage(content=compatibility_prompt)], config=THREAD_CONFIG)
-    analysis = response.content
+    analysis = await generate(
+        compatibility_prompt, node="analyze_compatibility",
+        cache_inputs=inputs
+    )
+    return analysis, token_report
+
+async def analyze_cv_job_compatibility(state: State):
+    """Analiza la compatibilidad entre el CV y la oferta laboral"""
+    print("6. Analizar compatibilidad CV-Trabajo")
+    analysis, token_report = await generate_compatibility_analysis(await load_cv_content(state), state["job_info"])
 
     print("Análisis de compatibilidad:", analysis)
     
     return {
         "compatibility_analysis": analysis,
-        "messages": state["messages"] + [AIMessage(content=f"Análisis de compatibilidad:\n{analysis}")]
+        "token_usage": {"analyze_compatibility": token_report},
+        "messages": [AIMessage(content=f"Análisis de compatibilidad:\n{preview(analysis)}")]
+    }
+
+async def draft_result(state: State):
+    """Genera de forma especulativa el resultado final mientras se valida el CV"""
+    print("Generar resultado en paralelo a la validación")
+    if state["person_is_postuled_to_job"]:
+        result = await analyze_cv_job_compatibility(state)
+    else:
+        result = await create_cv_summary(state)
+    for message in result["messages"]:
+        message.id = f"{DRAFT_MESSAGE_PREFIX}{uuid.uuid4().hex}"
+    return result
+
+async def join_validation(state: State):
+    """Reúne la validación y el resultado especulativo, descartándolo si el CV no es válido"""
+    print("3. Reunir validación y resultado especulativo")
+    if state["is_cv_valid"]:
+        return {"is_cv_valid": True}
+
+    print("CV no válido, se descarta el resultado especulativo.")
+    # El borrador de esta ejecución es el último mensaje con el prefijo; los anteriores son de análisis válidos
+    draft_ids = [message.id for message in state["messages"] if (message.id or "").startswith(DRAFT_MESSAGE_PREFIX)]
+    return {
+        "is_cv_valid": False,
+        "summary": "",
+        "compatibility_analysis": "",
+        "messages": [RemoveMessage(id=draft_ids[-1])] if draft_ids else []
     }
+
+def route_after_join(state: State):
+    """Termina si el CV es válido o pasa a la retroalimentación si no lo es"""
+    if state["is_cv_valid"]:
+        return END
+    return "provide_feedback"
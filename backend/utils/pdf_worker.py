@@ -0,0 +1,51 @@
+import io
+import sys
+import multiprocessing
+from contextlib import contextmanager
+from typing import List
+from pypdf import PdfReader
+
+# Código de los procesos de extracción de PDF. Solo depende de pypdf y de la biblioteca estándar:
+# todo lo que el worker tenga que deserializar (la función y la clase de su proceso) vive aquí,
+# así que arrancarlo no carga la configuración, los grafos ni el modelo de embeddings del servidor
+
+
+def extract_pdf_pages(file_bytes: bytes, start: int, end: int) -> List[str]:
+    # Cada proceso abre el PDF y extrae solo su rango de páginas
+    reader = PdfReader(io.BytesIO(file_bytes))
+    return [reader.pages[number].extract_text() or "" for number in range(start, end)]
+
+
+@contextmanager
+def _main_module_hidden():
+    """Oculta el archivo del módulo principal mientras arranca un worker.
+
+    Con "spawn" y "forkserver" cada proceso hijo vuelve a importar `__main__`, que con
+    `python api_server.py` es la aplicación entera; sin `__file__` multiprocessing no lo hace.
+    """
+    main_module = sys.modules["__main__"]
+    main_file = main_module.__dict__.pop("__file__", None)
+    try:
+        yield
+    finally:
+        if main_file is not None:
+            main_module.__file__ = main_file
+
+
+class PDFWorkerProcess(multiprocessing.context.ForkServerProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        with _main_module_hidden():
+            return multiprocessing.context.ForkServerProcess._Popen(process_obj)
+
+
+class PDFWorkerContext(multiprocessing.context.ForkServerContext):
+    """Los workers salen de un forkserver que solo precarga este módulo: no heredan los hilos del
+    servidor, como ocurriría con fork, ni reimportan la aplicación, como ocurriría con spawn"""
+    Process = PDFWorkerProcess
+
+
+def pdf_worker_context() -> PDFWorkerContext:
+    context = PDFWorkerContext()
+    context.set_forkserver_preload([__name__])
+    return context
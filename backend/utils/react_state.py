@@ -1,13 +1,34 @@
 from typing import TypedDict, Annotated, Optional
+from langchain_core.messages import RemoveMessage
 from langgraph.graph import add_messages
+from utils.token_budget import merge_token_usage
+from utils.config import STATE_MAX_MESSAGES, REMOVE_ALL_MESSAGES
+
+def add_bounded_messages(left: list, right: list) -> list:
+    """Como add_messages, pero aplica los RemoveMessage y conserva solo los últimos STATE_MAX_MESSAGES mensajes"""
+    right = right if isinstance(right, list) else [right]
+    reset = [index for index, message in enumerate(right)
+             if isinstance(message, RemoveMessage) and message.id == REMOVE_ALL_MESSAGES]
+    if reset:
+        left, right = [], right[reset[-1] + 1:]
+    # La versión de langgraph fijada no interpreta RemoveMessage, así que se descartan aquí por id
+    removed = {message.id for message in right if isinstance(message, RemoveMessage)}
+    if removed:
+        left = [message for message in add_messages(left, []) if message.id not in removed]
+        right = [message for message in right if not isinstance(message, RemoveMessage)]
+    return add_messages(left, right)[-STATE_MAX_MESSAGES:]
 
 class State(TypedDict):
-    messages: Annotated[list, add_messages]
-    cv_content: str
+    messages: Annotated[list, add_bounded_messages]
+    # El texto completo del CV vive en el almacén de textos; el estado guarda su referencia
+    cv_content_ref: str
+    cv_content_preview: str
     is_cv_valid: bool
     feedback: str
     summary: str
     person_is_postuled_to_job: Optional[bool]
     job_info: Optional[str]
     compatibility_analysis: Optional[str]
-    cv_file_path: str
\ No newline at end of file
+    cv_file_path: str
+    document_id: Optional[str]
+    token_usage: Annotated[dict, merge_token_usage]
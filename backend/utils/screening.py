@@ -0,0 +1,130 @@
+import re
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.document_parser import ParsedDocument
+from utils.embeddings import get_embeddings
+from utils.executor import run_blocking
+from utils.nodes import generate_compatibility_analysis
+from utils.token_budget import count_tokens
+from utils.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, FULL_TEXT_TOKEN_BUDGET,
+    SCREENING_TOP_K, SCREENING_LLM_CONCURRENCY
+)
+
+MIN_REQUIREMENT_WORDS = 3
+SCORE_RE = re.compile(r"(\d{1,3})\s*%")
+
+
+@dataclass
+class ScreeningCandidate:
+    document_id: str
+    document: ParsedDocument
+    similarity: float = 0.0
+    cv_excerpt: str = ""
+    compatibility_score: Optional[int] = None
+    compatibility_analysis: str = ""
+    error: str = ""
+
+    def to_dict(self, rank: int) -> dict:
+        return {
+            "rank": rank,
+            "document_id": self.document_id,
+            "filename": self.document.filename,
+            "similarity": round(self.similarity, 4),
+            "compatibility_score": self.compatibility_score,
+            "compatibility_analysis": self.compatibility_analysis,
+            "analyzed": bool(self.compatibility_analysis),
+            "error": self.error
+        }
+
+
+def split_requirements(job_info: str) -> List[str]:
+    """Divide la oferta en frases o viñetas para comparar cada requisito por separado"""
+    pieces = re.split(r"[\n•;]+|(?<=[.!?])\s+", job_info)
+    requirements = [piece.strip(" -*\t") for piece in pieces]
+    requirements = [piece for piece in requirements if len(piece.split()) >= MIN_REQUIREMENT_WORDS]
+    return requirements or [job_info.strip()]
+
+
+def rank_candidates(candidates: List[ScreeningCandidate], job_info: str) -> List[ScreeningCandidate]:
+    """Puntúa todos los CV contra los requisitos de la oferta con una sola pasada de embeddings.
+
+    La puntuación de cada CV es la media, sobre los requisitos, de la similitud con su
+    fragmento más parecido; esos mismos fragmentos forman el extracto que recibe el LLM.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    requirements = split_requirements(job_info)
+
+    chunks_per_candidate = [text_splitter.split_text(candidate.document.text) or [""] for candidate in candidates]
+    all_chunks = [chunk for chunks in chunks_per_candidate for chunk in chunks]
+    vectors = np.array(get_embeddings().embed_documents(requirements + all_chunks), dtype=np.float32)
+    requirement_vectors = vectors[:len(requirements)]
+    chunk_vectors = vectors[len(requirements):]
+
+    offset = 0
+    for candidate, chunks in zip(candidates, chunks_per_candidate):
+        similarities = requirement_vectors @ chunk_vectors[offset:offset + len(chunks)].T
+        offset += len(chunks)
+        candidate.similarity = float(similarities.max(axis=1).mean())
+
+        if count_tokens(candidate.document.text) <= FULL_TEXT_TOKEN_BUDGET:
+            candidate.cv_excerpt = candidate.document.text
+            continue
+
+        # CV largo: se envían los fragmentos más afines a la oferta hasta llenar el presupuesto
+        excerpt, used_tokens = [], 0
+        for index in np.argsort(-similarities.max(axis=0)):
+            chunk_tokens = count_tokens(chunks[index])
+            if used_tokens + chunk_tokens > FULL_TEXT_TOKEN_BUDGET:
+                break
+            excerpt.append(chunks[index])
+            used_tokens += chunk_tokens
+        candidate.cv_excerpt = "\n".join(excerpt)
+
+    return sorted(candidates, key=lambda candidate: candidate.similarity, reverse=True)
+
+
+def parse_compatibility_score(analysis: str) -> Optional[int]:
+    match = SCORE_RE.search(analysis)
+    if match is None:
+        return None
+    return min(int(match.group(1)), 100)
+
+
+async def screen_candidates(
+    candidates: List[ScreeningCandidate],
+    job_info: str,
+    top_k: int = SCREENING_TOP_K,
+    concurrency: int = SCREENING_LLM_CONCURRENCY
+) -> List[dict]:
+    """Preordena los CV por similitud vectorial y solo analiza con el LLM los mejores"""
+    print(f"Cribando {len(candidates)} CV contra la oferta...")
+    ranked = await run_blocking(rank_candidates, candidates, job_info)
+    shortlisted, rest = ranked[:top_k], ranked[top_k:]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyze(candidate: ScreeningCandidate):
+        # Un fallo del LLM (timeout, 429...) solo deja sin analizar a ese candidato, no a todo el lote
+        try:
+            async with semaphore:
+                candidate.compatibility_analysis, _ = await generate_compatibility_analysis(candidate.cv_excerpt, job_info)
+        except Exception as error:
+            print(f"Error analizando el candidato {candidate.document_id}: {error}")
+            candidate.error = str(error)
+            return
+        candidate.compatibility_score = parse_compatibility_score(candidate.compatibility_analysis)
+
+    await asyncio.gather(*(analyze(candidate) for candidate in shortlisted))
+
+    shortlisted.sort(
+        key=lambda candidate: (
+            candidate.compatibility_score if candidate.compatibility_score is not None else -1,
+            candidate.similarity
+        ),
+        reverse=True
+    )
+    return [candidate.to_dict(rank) for rank, candidate in enumerate(shortlisted + rest, start=1)]
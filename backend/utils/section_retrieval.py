@@ -0,0 +1,74 @@
+import threading
+from typing import List, Tuple
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from utils.embeddings import get_embeddings
+from utils.config import SECTION_MIN_SCORE
+
+SECTION_QUERIES = {
+    "personal_info": "información personal nombre contacto teléfono email",
+    "experience": "experiencia laboral trabajo empresa puesto responsabilidades",
+    "education": "educación formación académica universidad estudios título",
+    "skills": "habilidades competencias técnicas lenguajes programación",
+    "achievements": "logros certificaciones premios reconocimientos"
+}
+CHUNKS_PER_SECTION = 3
+
+_query_vectors = None
+_query_vectors_lock = threading.Lock()
+
+
+def get_section_query_vectors() -> np.ndarray:
+    """Embebe las consultas de sección una sola vez por proceso, en un único lote"""
+    global _query_vectors
+    with _query_vectors_lock:
+        if _query_vectors is None:
+            vectors = get_embeddings().embed_documents(list(SECTION_QUERIES.values()))
+            _query_vectors = np.array(vectors, dtype=np.float32)
+        return _query_vectors
+
+
+def get_index_chunks(vectors: FAISS) -> Tuple[np.ndarray, List[str]]:
+    """Recupera del índice FAISS los vectores ya calculados de cada fragmento y su texto"""
+    total = vectors.index.ntotal
+    matrix = vectors.index.reconstruct_n(0, total)
+    texts = [
+        vectors.docstore.search(vectors.index_to_docstore_id[position]).page_content
+        for position in range(total)
+    ]
+    return matrix, texts
+
+
+def assign_sections(
+    scores: np.ndarray,
+    texts: List[str],
+    full_text: str = "",
+    chunks_per_section: int = CHUNKS_PER_SECTION,
+    min_score: float = SECTION_MIN_SCORE,
+) -> dict:
+    """Reparte los fragmentos entre secciones a partir de la matriz de afinidad sección × fragmento.
+
+    Cada fragmento va a su sección más afín; una sección sin fragmentos propios, o cuyo mejor
+    fragmento propio no alcanza `min_score`, toma prestados los más afines de todo el CV.
+    Con menos fragmentos que secciones el reparto dejaría secciones vacías, así que se
+    devuelve el texto completo, igual que cuando no hay índice.
+    """
+    if len(texts) < len(SECTION_QUERIES):
+        return {"raw_content": full_text or "\n".join(texts)}
+
+    best_section = scores.argmax(axis=0)
+    sections = {}
+    for section_index, section in enumerate(SECTION_QUERIES):
+        positions = np.flatnonzero(best_section == section_index)
+        if positions.size == 0 or scores[section_index, positions].max() < min_score:
+            positions = np.arange(len(texts))
+        top = positions[np.argsort(-scores[section_index, positions])][:chunks_per_section]
+        sections[section] = "\n".join(texts[position] for position in sorted(top))
+    return sections
+
+
+def extract_sections(vectors: FAISS, full_text: str = "", chunks_per_section: int = CHUNKS_PER_SECTION) -> dict:
+    """Asigna los fragmentos del CV a sus secciones con una sola búsqueda matricial"""
+    chunk_matrix, texts = get_index_chunks(vectors)
+    scores = get_section_query_vectors() @ chunk_matrix.T
+    return assign_sections(scores, texts, full_text, chunks_per_section)
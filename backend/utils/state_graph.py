@@ -1,33 +1,84 @@
 from utils.react_state import State
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from utils.checkpointer import get_checkpointer
+from utils.metrics import timed_node
+from utils.config import WORKFLOW_MODE
 from utils.nodes import (
     extract_cv_content, validate_cv_structure,
     provide_feedback, person_is_postuled_to_job,
+    resume_from_checkpoint, route_entry,
     ask_info_about_job, create_cv_summary,
     analyze_cv_job_compatibility, route_after_validation,
-    route_after_postuling_to_job
+    route_after_postuling_to_job, draft_result,
+    join_validation, route_after_join
 )
 
-workflow = StateGraph(State)
+def build_sequential_workflow():
+    """Flujo original: cada nodo espera al anterior"""
+    workflow = StateGraph(State)
 
-workflow.add_node("extract_content", extract_cv_content)
-workflow.add_node("validate_structure", validate_cv_structure)
-workflow.add_node("provide_feedback", provide_feedback)
-workflow.add_node("person_is_postuled_to_job", person_is_postuled_to_job)
-workflow.add_node("ask_info_about_job", ask_info_about_job)
-workflow.add_node("create_summary", create_cv_summary)
-workflow.add_node("analyze_compatibility", analyze_cv_job_compatibility)
+    workflow.add_node("resume", timed_node("resume", resume_from_checkpoint))
+    workflow.add_node("extract_content", timed_node("extract_content", extract_cv_content))
+    workflow.add_node("validate_structure", timed_node("validate_structure", validate_cv_structure))
+    workflow.add_node("provide_feedback", timed_node("provide_feedback", provide_feedback))
+    workflow.add_node("check_postulation", timed_node("check_postulation", person_is_postuled_to_job))
+    workflow.add_node("ask_info_about_job", timed_node("ask_info_about_job", ask_info_about_job))
+    workflow.add_node("create_summary", timed_node("create_summary", create_cv_summary))
+    workflow.add_node("analyze_compatibility", timed_node("analyze_compatibility", analyze_cv_job_compatibility))
 
-workflow.set_entry_point("extract_content")
-workflow.add_edge("extract_content", "validate_structure")
-workflow.add_conditional_edges("validate_structure", route_after_validation)
-workflow.add_conditional_edges("person_is_postuled_to_job", route_after_postuling_to_job)
-workflow.add_edge("ask_info_about_job", "analyze_compatibility")
-workflow.add_edge("analyze_compatibility", END)
-workflow.add_edge("provide_feedback", END)
-workflow.add_edge("create_summary", END)
+    workflow.set_entry_point("resume")
+    workflow.add_conditional_edges("resume", route_entry, {
+        "extract": "extract_content",
+        "feedback": "provide_feedback",
+        "analysis": "analyze_compatibility",
+        "summary": "create_summary"
+    })
+    workflow.add_edge("extract_content", "validate_structure")
+    workflow.add_conditional_edges("validate_structure", route_after_validation)
+    workflow.add_conditional_edges("check_postulation", route_after_postuling_to_job)
+    workflow.add_edge("ask_info_about_job", "analyze_compatibility")
+    workflow.add_edge("analyze_compatibility", END)
+    workflow.add_edge("provide_feedback", END)
+    workflow.add_edge("create_summary", END)
 
-checkpointer = MemorySaver()
+    return workflow
 
-app = workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
+def build_parallel_workflow():
+    """Flujo en paralelo: la validación y el resultado final se generan como ramas simultáneas"""
+    workflow = StateGraph(State)
+
+    workflow.add_node("resume", timed_node("resume", resume_from_checkpoint))
+    workflow.add_node("extract_content", timed_node("extract_content", extract_cv_content))
+    workflow.add_node("validate_structure", timed_node("validate_structure", validate_cv_structure))
+    workflow.add_node("draft_result", timed_node("draft_result", draft_result))
+    workflow.add_node("join_validation", timed_node("join_validation", join_validation))
+    workflow.add_node("provide_feedback", timed_node("provide_feedback", provide_feedback))
+
+    workflow.set_entry_point("resume")
+    # Con el CV ya validado, draft_result genera el resultado y join_validation lo confirma
+    workflow.add_conditional_edges("resume", route_entry, {
+        "extract": "extract_content",
+        "feedback": "provide_feedback",
+        "analysis": "draft_result",
+        "summary": "draft_result"
+    })
+    workflow.add_edge("extract_content", "validate_structure")
+    workflow.add_edge("extract_content", "draft_result")
+    # Ambas ramas tienen un único nodo, así que terminan en el mismo paso y join_validation se ejecuta una vez
+    workflow.add_edge("validate_structure", "join_validation")
+    workflow.add_edge("draft_result", "join_validation")
+    workflow.add_conditional_edges("join_validation", route_after_join)
+    workflow.add_edge("provide_feedback", END)
+
+    return workflow
+
+if WORKFLOW_MODE == "parallel":
+    workflow = build_parallel_workflow()
+elif WORKFLOW_MODE == "sequential":
+    workflow = build_sequential_workflow()
+else:
+    raise ValueError(f"Modo de flujo no soportado: {WORKFLOW_MODE}")
+
+checkpointer = get_checkpointer()
+
+app = workflow.compile(checkpointer=checkpointer)
@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+from typing import Optional, Sequence
+from langchain_core.messages import BaseMessage
+from utils.metrics import request_timings
+
+_event_queue = contextvars.ContextVar("joblens_event_queue", default=None)
+
+
+def is_streaming() -> bool:
+    """Indica si la petición actual tiene un cliente escuchando eventos"""
+    return _event_queue.get() is not None
+
+
+def emit_event(event: str, **data):
+    """Publica un evento para el cliente de la petición actual, si lo hay"""
+    queue = _event_queue.get()
+    if queue is not None:
+        queue.put_nowait({"event": event, **data})
+
+
+def serialize_state(state: dict) -> dict:
+    """Convierte el estado del grafo en un diccionario serializable a JSON"""
+    return {
+        key: value for key, value in state.items()
+        if not (isinstance(value, list) and value and isinstance(value[0], BaseMessage))
+    }
+
+
+def project_state(state: dict, fields: Optional[Sequence[str]] = None) -> dict:
+    """Devuelve solo los campos que necesita el cliente; sin `fields`, todo el estado serializable"""
+    if fields is None:
+        return serialize_state(state)
+    return {field: state.get(field) for field in fields}
+
+
+async def stream_graph_events(graph, state: dict, config: dict, fields: Optional[Sequence[str]] = None):
+    """Ejecuta el grafo y va produciendo eventos de progreso de nodos y tokens del LLM"""
+    queue = asyncio.Queue()
+
+    async def run():
+        _event_queue.set(queue)
+        try:
+            async for update in graph.astream(state, config=config):
+                for node in update:
+                    if node != "__end__":
+                        queue.put_nowait({"event": "node", "node": node})
+            # Las actualizaciones de los nodos no incluyen lo que el hilo ya tenía guardado (p. ej. la
+            # validación reutilizada al reanudar), así que la salida se toma del estado final completo
+            result = (await graph.aget_state(config)).values
+            # Las cabeceras ya se enviaron, así que los tiempos por fase viajan en el último evento
+            timings = {phase: round(seconds * 1000, 1) for phase, seconds in (request_timings() or {}).items()}
+            queue.put_nowait({"event": "end", "output": project_state(result, fields), "timings_ms": timings})
+        except Exception as error:
+            queue.put_nowait({"event": "error", "detail": str(error)})
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            yield item
+            if item["event"] in ("end", "error"):
+                break
+    finally:
+        if not task.done():
+            task.cancel()
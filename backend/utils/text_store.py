@@ -0,0 +1,96 @@
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from utils.config import TEXT_STORE_PATH, TEXT_STORE_TTL_SECONDS, TEXT_STORE_MAX_ENTRIES
+
+
+class TextStore:
+    """Almacén direccionado por contenido para los textos grandes del estado de los grafos.
+
+    El estado y los checkpoints guardan solo la referencia (el hash del texto), así que el
+    texto completo del CV se escribe una vez en lugar de copiarse en cada paso del grafo.
+    """
+
+    def __init__(
+        self,
+        db_path: str = TEXT_STORE_PATH,
+        ttl_seconds: int = TEXT_STORE_TTL_SECONDS,
+        max_entries: int = TEXT_STORE_MAX_ENTRIES
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS texts (
+                ref TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_ref(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def put(self, text: str) -> str:
+        """Guarda el texto, si no estaba ya, y devuelve su referencia"""
+        ref = self.make_ref(text)
+        now = time.time()
+        with self._lock:
+            updated = self._conn.execute("UPDATE texts SET last_access = ? WHERE ref = ?", (now, ref)).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO texts (ref, data, last_access) VALUES (?, ?, ?)",
+                    (ref, zlib.compress(text.encode("utf-8")), now)
+                )
+                self._evict(now)
+            self._conn.commit()
+        return ref
+
+    def get(self, ref: str) -> str:
+        """Devuelve el texto o lanza KeyError si no existe o ha expirado"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM texts WHERE ref = ? AND last_access >= ?",
+                (ref, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                raise KeyError(f"Texto no encontrado o expirado: {ref}")
+            self._conn.execute("UPDATE texts SET last_access = ? WHERE ref = ?", (now, ref))
+            self._conn.commit()
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def contains(self, ref: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM texts WHERE ref = ? AND last_access >= ?",
+                (ref, time.time() - self.ttl_seconds)
+            ).fetchone()
+            return row is not None
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM texts WHERE last_access < ?", (now - self.ttl_seconds,))
+        self._conn.execute(
+            "DELETE FROM texts WHERE ref IN ("
+            "SELECT ref FROM texts ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+
+_text_store = None
+_text_store_lock = threading.Lock()
+
+
+def get_text_store() -> TextStore:
+    """Devuelve el almacén de textos compartido por todo el proceso"""
+    global _text_store
+    with _text_store_lock:
+        if _text_store is None:
+            _text_store = TextStore()
+        return _text_store
@@ -0,0 +1,186 @@
+import re
+import threading
+from typing import Dict, Optional, Tuple
+from utils.config import TOKENIZER_NAME, NODE_TOKEN_BUDGETS
+
+# Aproximación habitual para texto en español/inglés si no se puede cargar el tokenizador
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "[...]"
+MIN_DEDUPE_LINE_CHARS = 20
+
+BOILERPLATE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r"https?://\S+",
+    r"igualdad de oportunidades|equal opportunit",
+    r"pol[ií]tica de privacidad|privacy policy|cookies",
+    r"(post[uú]late|aplica|apply) (ahora|now|aqu[ií]|here)",
+    r"comparte? (esta|this) (oferta|job)|share this",
+    r"sobre nosotros|about us|qui[eé]nes somos",
+    r"todos los derechos reservados|all rights reserved",
+)]
+REQUIREMENT_CUES = re.compile(
+    r"requisit|requir|experiencia|experience|años|years|conocimient|knowledge|habilidad|skill|"
+    r"responsabilidad|responsib|deseable|nice to have|must|imprescindible|titulaci|degree|"
+    r"inglés|english|certific|dominio|manejo",
+    re.IGNORECASE
+)
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_tokenizer_unavailable = False
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_unavailable
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_unavailable:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+                # Solo contamos tokens, así que el límite de secuencia del modelo no aplica
+                _tokenizer.model_max_length = 10 ** 9
+            except Exception as error:
+                print(f"Tokenizador local no disponible ({error}), se estiman los tokens por caracteres.")
+                _tokenizer_unavailable = True
+        return _tokenizer
+
+
+def warm_up_tokenizer():
+    """Carga el tokenizador al arrancar para que la primera petición no lo descargue"""
+    _get_tokenizer()
+
+
+def count_tokens(text: str) -> int:
+    """Cuenta los tokens de un texto con el tokenizador local o, si no está disponible, los estima.
+
+    Es bloqueante (y la primera vez puede descargar el tokenizador): desde código asíncrono se
+    llama a través de `run_blocking`.
+    """
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def dedupe_lines(text: str) -> str:
+    """Elimina líneas repetidas, como las que introduce el solapamiento entre fragmentos"""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = re.sub(r"\s+", " ", line).strip().lower()
+        if len(key) >= MIN_DEDUPE_LINE_CHARS:
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def strip_boilerplate(text: str) -> str:
+    """Quita enlaces y líneas genéricas de las ofertas que no aportan requisitos"""
+    lines = [line for line in text.splitlines() if not any(pattern.search(line) for pattern in BOILERPLATE_PATTERNS[1:])]
+    return BOILERPLATE_PATTERNS[0].sub("", "\n".join(lines))
+
+
+def cut_line(line: str, budget: int) -> str:
+    """Recorta una línea por palabras al presupuesto, terminando en fin de frase si lo hay cerca"""
+    words = line.split(" ")
+    low, high = 0, len(words)
+    # Búsqueda binaria del prefijo más largo que cabe: pocas llamadas al tokenizador aunque la línea sea enorme
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = " ".join(words[:low])
+    boundary = max(prefix.rfind(". "), prefix.rfind("! "), prefix.rfind("? "))
+    return prefix[:boundary + 1] if boundary > len(prefix) // 2 else prefix
+
+
+def fit_to_budget(text: str, budget: int) -> str:
+    """Recorta el texto por líneas completas hasta que quepa en el presupuesto.
+
+    La línea que ya no cabe se corta por frases o palabras en lugar de descartarse, así que un
+    CV de un solo párrafo (o un PDF extraído sin saltos de línea) conserva su comienzo.
+    """
+    if count_tokens(text) <= budget:
+        return text
+
+    kept, used = [], count_tokens(TRUNCATION_MARKER)
+    for line in text.splitlines():
+        line_tokens = count_tokens(line) + 1
+        if used + line_tokens > budget:
+            partial = cut_line(line, budget - used - 1)
+            if partial:
+                kept.append(partial)
+            break
+        kept.append(line)
+        used += line_tokens
+    return "\n".join(kept + [TRUNCATION_MARKER])
+
+
+def select_relevant_sentences(text: str, budget: int) -> str:
+    """Conserva las frases de la oferta con más señales de requisito, en su orden original"""
+    if count_tokens(text) <= budget:
+        return text
+
+    sentences = [sentence.strip() for sentence in re.split(r"\n+|(?<=[.!?])\s+", text) if sentence.strip()]
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda index: (len(REQUIREMENT_CUES.findall(sentences[index])), -index),
+        reverse=True
+    )
+
+    selected, used = set(), 0
+    for index in ranked:
+        sentence_tokens = count_tokens(sentences[index]) + 1
+        if used + sentence_tokens > budget:
+            continue
+        selected.add(index)
+        used += sentence_tokens
+    return "\n".join(sentences[index] for index in sorted(selected))
+
+
+def compress_input(name: str, text: str, budget: int) -> str:
+    """Aplica la compresión adecuada a cada tipo de entrada antes de recortarla"""
+    text = dedupe_lines(text or "")
+    if name == "job_info":
+        text = select_relevant_sentences(strip_boilerplate(text), budget)
+    return fit_to_budget(text, budget)
+
+
+def budget_inputs(node: str, **inputs: str) -> Tuple[Dict[str, str], dict]:
+    """Ajusta las entradas de un prompt al presupuesto del nodo y devuelve el informe de tokens"""
+    budgets = NODE_TOKEN_BUDGETS.get(node, {})
+    fitted, report = {}, {}
+    for name, text in inputs.items():
+        original_tokens = count_tokens(text or "")
+        budget = budgets.get(name)
+        fitted[name] = compress_input(name, text, budget) if budget and original_tokens > budget else (text or "")
+        report[name] = {"original": original_tokens, "used": count_tokens(fitted[name])}
+    return fitted, report
+
+
+def budget_sections(node: str, sections: Dict[str, str]) -> Tuple[Dict[str, str], dict]:
+    """Reparte el presupuesto de las secciones del CV a partes iguales entre ellas"""
+    budget = NODE_TOKEN_BUDGETS.get(node, {}).get("cv_sections")
+    per_section = budget // max(1, len(sections)) if budget else None
+    fitted, report = {}, {}
+    for name, text in sections.items():
+        original_tokens = count_tokens(text)
+        fitted[name] = compress_input(name, text, per_section) if per_section and original_tokens > per_section else text
+        report[name] = {"original": original_tokens, "used": count_tokens(fitted[name])}
+    return fitted, report
+
+
+def merge_token_usage(current: dict, update: Optional[dict]) -> dict:
+    """Reductor del estado: combina los informes de tokens de nodos que se ejecutan en paralelo.
+
+    Una actualización None vacía el informe; la entrada de cada ejecución la usa para no arrastrar
+    el consumo de ejecuciones anteriores del mismo hilo.
+    """
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
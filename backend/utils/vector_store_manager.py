@@ -1,61 +1,66 @@
-import os
 from langchain_community.vectorstores import FAISS
-from langchain_community.document_loaders import TextLoader, PyPDFLoader, Docx2txtLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.embeddings import HuggingFaceBgeEmbeddings
+from utils.embeddings import get_embeddings
+from utils.document_parser import ParsedDocument
+from utils.config import EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP, INDEX_STORAGE
+from utils.index_cache import FAISSIndexCache, get_index_cache
+from utils.metrics import FAISS_DURATION, CACHE_LOOKUPS, timed
 
 
 class CVEmbeddingManager:
-    def __init__(self, faiss_path: str = "cv_faiss_index"):
-        self.faiss_path = faiss_path
-        self.embeddings = HuggingFaceBgeEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cuda'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-
-    def load_cv(self, file_path: str):
-        """Carga un CV desde archivo local, soportando .txt, .pdf y .docx"""
-        ext = os.path.splitext(file_path)[1].lower()
-
-        if ext == ".txt":
-            loader = TextLoader(file_path)
-        elif ext == ".pdf":
-            loader = PyPDFLoader(file_path)
-        elif ext == ".docx":
-            loader = Docx2txtLoader(file_path)
-        else:
-            raise ValueError(f"Formato de archivo no soportado: {ext}")
+    """Gestiona el índice FAISS de un único CV, aislado del resto de peticiones"""
+
+    def __init__(self, storage: str = INDEX_STORAGE, index_cache: FAISSIndexCache = None):
+        if storage not in ("cache", "memory"):
+            raise ValueError(f"Almacenamiento de índices no soportado: {storage}")
 
-        print(f"Cargando CV desde {file_path}...")
-        docs = loader.load()
-        return docs
+        self.storage = storage
+        self.index_cache = index_cache or (get_index_cache() if storage == "cache" else None)
+        self.vectors = None
 
-    def embed_and_store_cv(self, file_path: str):
-        """Genera embeddings del CV y los guarda en un índice FAISS local"""
-        docs = self.load_cv(file_path)
+    @property
+    def embeddings(self):
+        # El modelo solo se carga si realmente hace falta embeber o consultar
+        return get_embeddings()
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        split_docs = text_splitter.split_documents(docs)
+    def get_cache_key(self, document: ParsedDocument) -> str:
+        """Calcula la clave (espacio de nombres) del índice a partir del contenido del archivo"""
+        return FAISSIndexCache.make_key(document.content_hash, EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP)
 
-        vectors = FAISS.from_documents(split_docs, self.embeddings)
-        vectors.save_local(self.faiss_path)
-        print("Embeddings generados y guardados exitosamente en FAISS.")
+    def embed_and_store_cv(self, document: ParsedDocument):
+        """Genera embeddings del CV en un índice propio, en memoria o en la caché del documento"""
+        cache_key = None
+        vectors = None
+        if self.index_cache is not None:
+            cache_key = self.get_cache_key(document)
+            with timed(FAISS_DURATION, "faiss_load", operation="load"):
+                vectors = self.index_cache.get(cache_key, self.embeddings)
+            CACHE_LOOKUPS.inc(cache="faiss_index", result="hit" if vectors is not None else "miss")
+
+        if vectors is not None:
+            print("Índice FAISS recuperado de la caché, se omite la generación de embeddings.")
+        else:
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP
+            )
+            split_docs = text_splitter.split_documents(document.to_documents())
+
+            with timed(FAISS_DURATION, "faiss_build", operation="build"):
+                vectors = FAISS.from_documents(split_docs, self.embeddings)
+            if self.index_cache is not None:
+                with timed(FAISS_DURATION, "faiss_save", operation="save"):
+                    self.index_cache.put(cache_key, vectors)
+            print("Embeddings generados exitosamente en FAISS.")
+
+        self.vectors = vectors
 
         return vectors
 
     def get_retriever(self, k=5):
         """Devuelve un retriever configurado para el CV embebido"""
-        if not os.path.exists(self.faiss_path):
-            raise FileNotFoundError("No existe índice FAISS. Ejecuta primero `embed_and_store_cv()`.")
-        
-        vectors = FAISS.load_local(
-            folder_path=self.faiss_path,
-            embeddings=self.embeddings,
-            allow_dangerous_deserialization=True
-        )
-        retriever = vectors.as_retriever(search_kwargs={"k": k})
+        if self.vectors is None:
+            raise RuntimeError("No hay índice FAISS cargado. Ejecuta primero `embed_and_store_cv()`.")
+
+        retriever = self.vectors.as_retriever(search_kwargs={"k": k})
         return retriever
@@ -1,6 +1,8 @@
+import json
+import time
+import uuid
 import streamlit as st
 import requests
-import tempfile
 from typing import Optional
 
 # Configuración de la página
@@ -12,15 +14,158 @@ st.set_page_config(
     layout="wide"
 )
 
-API_URL = "http://localhost:8000/joblens/invoke"
-API_URL_IMPROVE_CV = "http://localhost:8000/joblens/improve-cv/invoke"
+API_URL_DOCUMENTS = "http://localhost:8000/joblens/documents"
+API_URL_EVENTS = "http://localhost:8000/joblens/events"
+API_URL_JOBS = "http://localhost:8000/joblens/jobs"
+# Espera de cada consulta long-poll y tiempo máximo total de un trabajo
+JOB_POLL_WAIT_SECONDS = 25
+JOB_MAX_SECONDS = 600
 
-def send_request(cv_file_path: str, person_is_postuled_to_job: bool, job_info: Optional[str] = None) -> dict:
+# Nodos cuyos tokens se muestran al usuario mientras se generan
+STREAMED_NODES = {
+    "provide_feedback": "Feedback",
+    "create_summary": "Summary for your CV",
+    "analyze_compatibility": "Compatibility Analysis",
+    "improve_structure": "Improved CV (draft)",
+    "format_cv": "Improved CV",
+}
+
+def client_headers() -> dict:
+    """Identifica la sesión ante el backend para que los límites por cliente no se compartan"""
+    if "client_id" not in st.session_state:
+        st.session_state.client_id = uuid.uuid4().hex
+    return {"X-Client-ID": st.session_state.client_id}
+
+def forget_document():
+    """Olvida el documento subido para que la próxima ejecución vuelva a subir el CV"""
+    st.session_state.pop("upload_key", None)
+    st.session_state.pop("document_id", None)
+    st.warning("The uploaded CV expired on the server, please run the analysis again to upload it once more.")
+
+def stream_events(url: str, payload: dict) -> dict:
+    """Consume el stream NDJSON del backend mostrando el progreso y devuelve la salida final"""
+    status = st.empty()
+    title = st.empty()
+    text = st.empty()
+    current_node = None
+    streamed_text = ""
+
+    try:
+        with requests.post(url, json=payload, headers=client_headers(), stream=True, timeout=(10, 120)) as response:
+            if response.status_code == 429:
+                st.warning(f"The server is busy, please retry in {response.headers.get('Retry-After', 'a few')} seconds.")
+                return {}
+            if response.status_code == 404:
+                forget_document()
+                return {}
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+
+                if event["event"] == "node":
+                    status.caption(f"Completed step: {event['node']}")
+                elif event["event"] == "token" and event["node"] in STREAMED_NODES:
+                    if event["node"] != current_node:
+                        current_node = event["node"]
+                        streamed_text = ""
+                        title.subheader(STREAMED_NODES[current_node])
+                    streamed_text += event["content"]
+                    text.markdown(streamed_text)
+                elif event["event"] == "error":
+                    st.error(f"Error during the analysis: {event['detail']}")
+                    return {}
+                elif event["event"] == "end":
+                    return {"output": event["output"]}
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error connecting to the API: {e}")
+        return {}
+    finally:
+        status.empty()
+        title.empty()
+        text.empty()
+
+    return {}
+
+def run_job(kind: str, job_input: dict) -> dict:
+    """Encola un trabajo en el backend y consulta su estado con long-poll hasta que termina"""
+    status = st.empty()
+    try:
+        response = requests.post(
+            API_URL_JOBS, json={"kind": kind, "input": job_input}, headers=client_headers(), timeout=10
+        )
+        if response.status_code == 429:
+            st.warning(f"The server is busy, please retry in {response.headers.get('Retry-After', 'a few')} seconds.")
+            return {}
+        if response.status_code == 404:
+            forget_document()
+            return {}
+        response.raise_for_status()
+        job_id = response.json()["job_id"]
+
+        deadline = time.monotonic() + JOB_MAX_SECONDS
+        while time.monotonic() < deadline:
+            response = requests.get(
+                f"{API_URL_JOBS}/{job_id}",
+                params={"wait": JOB_POLL_WAIT_SECONDS},
+                headers=client_headers(),
+                timeout=(10, JOB_POLL_WAIT_SECONDS + 10)
+            )
+            response.raise_for_status()
+            job = response.json()
+            if job["status"] == "succeeded":
+                return {"output": job["output"]}
+            if job["status"] == "failed":
+                st.error(f"Error during the job: {job['error']}")
+                return {}
+            status.caption(f"Job {job['status']}...")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error connecting to the API: {e}")
+        return {}
+    finally:
+        status.empty()
+
+    st.error("The job is taking too long, please try again later.")
+    return {}
+
+def document_is_available(document_id: str) -> bool:
+    """Comprueba que el backend conserva el documento; expira tras un tiempo sin uso"""
+    try:
+        response = requests.get(f"{API_URL_DOCUMENTS}/{document_id}", headers=client_headers(), timeout=10)
+    except requests.exceptions.RequestException:
+        # Si no se puede comprobar se reutiliza el identificador; el análisis informará del error
+        return True
+    return response.status_code != 404
+
+def upload_document(uploaded_file) -> str:
+    """Sube el CV al backend una sola vez por archivo y devuelve su identificador"""
+    upload_key = f"{uploaded_file.name}:{uploaded_file.size}"
+    if st.session_state.get("upload_key") == upload_key and document_is_available(st.session_state.document_id):
+        return st.session_state.document_id
+
+    try:
+        response = requests.post(
+            API_URL_DOCUMENTS,
+            files={"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)},
+            headers=client_headers(),
+            timeout=30
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        st.error(f"Error uploading the CV: {e}")
+        return ""
+
+    st.session_state.upload_key = upload_key
+    st.session_state.document_id = response.json()["document_id"]
+    return st.session_state.document_id
+
+def send_request(document_id: str, person_is_postuled_to_job: bool, job_info: Optional[str] = None) -> dict:
     payload = {
         "input": {
             "person_is_postuled_to_job": person_is_postuled_to_job,
             "job_info": job_info if job_info else "",
-            "cv_file_path": cv_file_path
+            "document_id": document_id
         },
         "config": {},
         "kwargs": {
@@ -28,33 +173,19 @@ def send_request(cv_file_path: str, person_is_postuled_to_job: bool, job_info: O
         }
     }
     
-    try:
-        response = requests.post(API_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        st.error(f"Error connecting to the API: {e}")
-        return {}
+    return stream_events(API_URL_EVENTS, payload)
 
-def send_improve_cv_request(cv_content: str, feedback: str, cv_file_path: str) -> dict:
-    improve_payload = {
-        "input": {
-            "cv_content": cv_content,
-            "feedback": feedback,
-            "cv_file_path": cv_file_path
-        },
-        "config": {},
-        "kwargs": {}
+def send_improve_cv_request(cv_content_ref: str, feedback: str, document_id: str) -> dict:
+    improve_input = {
+        "cv_content_ref": cv_content_ref,
+        "feedback": feedback,
+        "document_id": document_id
     }
     
-    improve_response = requests.post(
-        API_URL_IMPROVE_CV,
-        json=improve_payload, 
-        timeout=60
-    )
+    # La mejora encadena varias llamadas al LLM; se ejecuta como trabajo para no mantener la conexión abierta
+    improved_data = run_job("improve", improve_input)
     
-    if improve_response.status_code == 200:
-        improved_data = improve_response.json()
+    if improved_data:
         st.success("Improved CV generated successfully!")
         
         with st.expander("Improved CV", expanded=True):
@@ -88,18 +219,16 @@ def main():
         st.subheader("1. Upload Your CV")
         uploaded_file = st.file_uploader(
             "Selecciona tu CV",
-            type=['pdf', 'doc', 'docx', 'txt'],
-            help="Formats supported: PDF, DOC, DOCX, TXT"
+            type=['pdf', 'docx', 'txt'],
+            help="Formats supported: PDF, DOCX, TXT"
         )
 
-        file_path = ""
+        document_id = ""
         
         if uploaded_file:
-            st.success(f"File loaded: {uploaded_file.name}")
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{uploaded_file.name}") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                file_path = tmp_file.name
+            document_id = upload_document(uploaded_file)
+            if document_id:
+                st.success(f"File loaded: {uploaded_file.name}")
             
             file_details = {
                 "Name": uploaded_file.name,
@@ -135,15 +264,15 @@ def main():
             "Analyze CV",
             type="primary",
             use_container_width=True,
-            disabled=not uploaded_file
+            disabled=not document_id
         )
     
     with col2:
         st.header("Analysis Results")
         
-        if analyze_button and uploaded_file:
+        if analyze_button and document_id:
             with st.spinner("Analyzing your CV..."):
-                response = send_request(file_path, is_looking_for_job, job_description)
+                response = send_request(document_id, is_looking_for_job, job_description)
                 
                 if response:
                     st.session_state.analysis_results = response
@@ -176,11 +305,11 @@ def main():
                             st.success("Generating a new CV based on the feedback provided.")
 
                             with st.spinner("Generating improved CV..."):
-                                cv_content = response['output'].get('cv_content', '')
+                                cv_content_ref = response['output'].get('cv_content_ref', '')
                                 feedback = response['output'].get('feedback', 'No feedback provided.')
-                                file_path = response['output'].get('cv_file_path', '')
+                                document_id = response['output'].get('document_id', '')
 
-                                send_improve_cv_request(cv_content, feedback, file_path)
+                                send_improve_cv_request(cv_content_ref, feedback, document_id)
 
                     else:
                         if isinstance(response["output"]["person_is_postuled_to_job"], bool):
@@ -192,7 +321,7 @@ def main():
                                 st.write(response['output'].get('summary', 'No summary provided.'))
 
                 with st.expander("CV Content", expanded=True):
-                    st.text_area("CV Content", value=response['output'].get('cv_content', 'No CV content provided.'), height=300)
+                    st.text_area("CV Content", value=response['output'].get('cv_content_preview') or 'No CV content provided.', height=300)
 
             else:
                 st.warning("No output found in the response.")